@@ -0,0 +1,63 @@
+"""Compare sorting version identifiers with and without parsed Versions.
+
+Usage: python benchmarks/version_sort.py [count]
+"""
+from functools import cmp_to_key
+import random
+import sys
+import time
+
+from rpc_component.schemata import Version, version_key
+
+
+def generate_versions(count):
+    versions = set()
+    prereleases = ("", "-alpha.1", "-beta.2", "-rc.1")
+    while len(versions) < count:
+        versions.add(
+            "{}.{}.{}{}".format(
+                random.randint(0, 99),
+                random.randint(0, 99),
+                random.randint(0, 99),
+                random.choice(prereleases),
+            )
+        )
+    versions = list(versions)
+    random.shuffle(versions)
+    return versions
+
+
+def compare_unparsed(a, b):
+    a_key = version_key(a)
+    b_key = version_key(b)
+    return (a_key > b_key) - (a_key < b_key)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(count):
+    random.seed(0)
+    versions = generate_versions(count)
+
+    unparsed = timed(
+        lambda vs: sorted(vs, key=cmp_to_key(compare_unparsed)), versions
+    )
+    parsed = timed(lambda vs: sorted(Version(v) for v in vs), versions)
+
+    for label, duration in (
+        ("regex per comparison", unparsed),
+        ("parsed Version", parsed),
+    ):
+        print(
+            "{label:>22}: {d:.3f}s ({rate:,.0f} versions/s)".format(
+                label=label, d=duration, rate=count / duration
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,64 @@
+"""Compare the pure Python and libyaml paths used to load and save data.
+
+Usage: python benchmarks/yaml_io.py [releases]
+"""
+import sys
+import time
+
+import yaml
+
+from rpc_component.component import Component
+
+
+def build_component_data(count):
+    component = Component(
+        name="benchmark",
+        repo_url="https://github.com/rcbops/benchmark",
+        is_product=False,
+        releases=[
+            {
+                "version": "{}.{}.{}".format(
+                    i // 10000, i // 100 % 100, i % 100
+                ),
+                "sha": "{:040x}".format(i),
+                "series": "series-{}".format(i // 10000),
+            }
+            for i in range(count)
+        ],
+    )
+    return component.to_dict()
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(count):
+    if not yaml.__with_libyaml__:
+        sys.exit("PyYAML was built without libyaml.")
+
+    data = build_component_data(count)
+    paths = (
+        ("pure Python", yaml.SafeLoader, yaml.SafeDumper),
+        ("libyaml", yaml.CSafeLoader, yaml.CSafeDumper),
+    )
+    outputs = []
+    for label, loader, dumper in paths:
+        dump_time, text = timed(
+            lambda: yaml.dump(data, Dumper=dumper, default_flow_style=False)
+        )
+        load_time, _ = timed(lambda: yaml.load(text, Loader=loader))
+        outputs.append(text)
+        print(
+            "{label:>12}: load {load:.3f}s, dump {dump:.3f}s".format(
+                label=label, load=load_time, dump=dump_time
+            )
+        )
+    print("identical output: {}".format(outputs[0] == outputs[1]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
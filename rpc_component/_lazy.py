@@ -0,0 +1,24 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Return module `name`, deferring its execution until first use.
+
+    Importing git, yaml and schema dominates start-up time, and many
+    commands need only some of them.
+    """
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
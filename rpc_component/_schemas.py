@@ -0,0 +1,267 @@
+from collections import ChainMap
+
+from schema import And, Optional, Or, Regex, Schema
+
+from rpc_component.schemata import (
+    branch_constraint_regex, is_sorted_versions, is_value_unique,
+    is_version_ids_unique, sha_regex, version_constraint_regex, version_regex,
+)
+
+
+version_id_schema = Regex(version_regex)
+version_sha_schema = Regex(sha_regex)
+version_schema = Schema(
+    {
+        "version": version_id_schema,
+        "sha": version_sha_schema,
+    },
+)
+
+comparison_added_version_schema = Schema(
+    And(
+        {
+            And(str, len): {
+                "added": {
+                    "releases": And(
+                        [
+                            {
+                                Optional("series"): And(str, len),
+                                "versions": And(
+                                    [version_schema],
+                                    lambda vs: len(vs) == 1,
+                                ),
+                            }
+                        ],
+                        lambda rs: len(rs) == 1,
+                    )
+                },
+                "deleted": {},
+            }
+        },
+        lambda cs: len(cs) == 1,
+    )
+)
+
+repo_url_schema = Regex(r"^https://github.com/.+")
+
+branch_constraints_schema = And(
+    [Regex(branch_constraint_regex)],
+    lambda cs: len(cs) == 1,
+)
+
+constraints_schema = Or(
+    [Regex(version_constraint_regex)],
+    branch_constraints_schema,
+)
+
+component_single_version_schema = Schema(
+    {
+        "name": And(str, len),
+        "repo_url": repo_url_schema,
+        "is_product": bool,
+        "release": {
+            "series": And(str, len),
+            "version": version_id_schema,
+            "sha": version_sha_schema,
+        },
+        Optional("artifact_stores", default=[]): And(
+            [
+                {
+                    "description": Or(str, None),
+                    "name": And(str, len),
+                    "public_url": And(str, len),
+                    "type": And(str, len),
+                },
+            ],
+            is_value_unique("name"),
+        ),
+    }
+)
+
+component_schema = Schema(
+    {
+        "name": And(str, len),
+        "repo_url": repo_url_schema,
+        "is_product": bool,
+        "releases": And(
+            [
+                {
+                    "series": And(str, len),
+                    "versions": And(
+                        [
+                            version_schema,
+                        ],
+                        is_sorted_versions,
+                    ),
+                },
+            ],
+            is_value_unique("series"),
+            is_version_ids_unique,
+        ),
+        Optional("artifact_stores", default=[]): And(
+            [
+                {
+                    "description": Or(str, None),
+                    "name": And(str, len),
+                    "public_url": And(str, len),
+                    "type": And(str, len),
+                },
+            ],
+            is_value_unique("name"),
+        ),
+    }
+)
+
+dependencies_schema = Schema(
+    {
+        Optional("dependencies"): And(
+            [
+                {
+                    "name": And(str, len),
+                    "constraints": constraints_schema,
+                },
+            ],
+            is_value_unique("name"),
+        )
+    }
+)
+
+artifacts_file_schema = Schema(
+    {
+        "type": "file",
+        "source": And(str, len),
+        Optional("dest"): And(str, len),
+        Optional("expire_after"): And(int, lambda n: n > 0)
+    }
+)
+
+artifacts_log_schema = Schema(
+    {
+        "type": "log",
+        "source": And(str, len)
+    }
+)
+
+artifacts_schema = Schema(
+    {
+        Optional("artifacts"):
+            [
+                Or(artifacts_file_schema, artifacts_log_schema)
+            ]
+    }
+)
+
+jenkins_schema = Schema(
+    {
+        Optional("jenkins"): {
+            Optional("jjb_paths"): [And(str, len)],
+        }
+    }
+)
+
+component_metadata_schema = Schema(
+    dict(
+        ChainMap(
+            *(s._schema for s in
+                (
+                    dependencies_schema,
+                    artifacts_schema,
+                    jenkins_schema,
+                )
+              )
+        )
+    )
+)
+
+component_requirements_schema = Schema(
+    {
+        "dependencies": And(
+            [
+                {
+                    "name": And(str, len),
+                    "ref": Or(And(str, len), None),
+                    "ref_type": Or(lambda r: r in ("branch", "tag"), None),
+                    "repo_url": repo_url_schema,
+                    "sha": version_sha_schema,
+                    "version": Or(version_id_schema, None),
+                }
+            ],
+            is_value_unique("name"),
+        ),
+    }
+)
+
+comparison_added_component_schema = Schema(
+    And(
+        {
+            And(str, len): {
+                "added": And(component_schema),
+                "deleted": {},
+            }
+        },
+        lambda cs: len(cs) == 1,
+    )
+)
+
+comparison_added_artifact_stores_schema = Schema(
+    And(
+        {
+            And(str, len): {
+                "added": {
+                    "artifact_stores": And(
+                        [
+                            {
+                                "description": Or(str, None),
+                                "name": And(str, len),
+                                "public_url": And(str, len),
+                                "type": And(str, len),
+                            },
+                        ],
+                        is_value_unique("name"),
+                    ),
+                },
+                "deleted": {},
+            }
+        },
+        lambda s: len(s) == 1,
+    )
+)
+
+
+batch_schema = Schema(
+    [
+        Or(
+            {
+                "operation": "add",
+                "component_name": And(str, len),
+                "repo_url": repo_url_schema,
+                Optional("is_product", default=False): bool,
+                Optional("import_releases", default=[]): [
+                    Regex(r"^[^:]+:.+$")
+                ],
+            },
+            {
+                "operation": "update",
+                "component_name": And(str, len),
+                Optional("new_name"): And(str, len),
+                Optional("repo_url"): repo_url_schema,
+                Optional("is_product"): bool,
+            },
+            {
+                "operation": "release-add",
+                "component_name": And(str, len),
+                "version": version_id_schema,
+                "sha": version_sha_schema,
+                "series_name": And(str, len),
+            },
+            {
+                "operation": "artifact-store-add",
+                "component_name": And(str, len),
+                "name": And(str, len),
+                "type": And(str, len),
+                Optional("public_url", default=None): Or(str, None),
+                Optional("description", default=None): Or(str, None),
+            },
+        )
+    ]
+)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = "~/.rpc_component"
+
+
+class DiskCache:
+    """JSON values stored one per file with least recently used eviction.
+
+    Reading an entry refreshes its modification time, so when more than
+    `max_entries` are stored the least recently used are removed. Entries
+    older than `max_age` seconds, if it is given, are treated as missing.
+    """
+
+    def __init__(self, directory, max_entries=2000, max_age=None):
+        self.directory = os.path.expanduser(directory)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._count = None
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "{d}.json".format(d=digest))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        if (
+            self.max_age is not None and
+            time.time() - entry["created"] >= self.max_age
+        ):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def set(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        tmp_path = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "created": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+
+        if self._count is None:
+            self._count = len(self._entries())
+        elif is_new:
+            self._count += 1
+        if self._count > self.max_entries:
+            self.evict()
+
+    def _entries(self):
+        try:
+            return [
+                e for e in os.scandir(self.directory)
+                if e.name.endswith(".json")
+            ]
+        except FileNotFoundError:
+            return []
+
+    def evict(self):
+        entries = self._entries()
+        excess = len(entries) - self.max_entries
+        if excess > 0:
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:excess]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        self._count = min(len(entries), self.max_entries)
+
+    def clear(self):
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.endswith((".json", ".tmp")):
+                os.remove(entry.path)
+        self._count = 0
+
+
+def component_cache():
+    return DiskCache(os.path.join(CACHE_DIR, "components"))
+
+
+def branch_cache(ttl):
+    return DiskCache(os.path.join(CACHE_DIR, "branches"), max_age=ttl)
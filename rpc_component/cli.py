@@ -6,31 +6,41 @@ from copy import deepcopy
 import os
 import re
 import sys
-from tempfile import TemporaryDirectory
+import time
 
-import git
-from schema import SchemaError
-import yaml
-
-from rpc_component import component as c_lib
+from rpc_component import cache as cache_lib
 from rpc_component import schemata as s_lib
+from rpc_component._lazy import lazy_import
+
+
+git = lazy_import("git")
+schema = lazy_import("schema")
+c_lib = lazy_import("rpc_component.component")
 
 
-def component(releases_dir, components_dir, subparser, **kwargs):
+def schema_type(schema_name):
+    """Return an argparse type validating against a schemata schema."""
+    def validate(value):
+        try:
+            return getattr(s_lib, schema_name).validate(value)
+        except schema.SchemaError as e:
+            raise argparse.ArgumentTypeError(e.code)
+    validate.__name__ = schema_name
+    return validate
+
+
+def component(releases_dir, components_dir, subparser, cache=None, **kwargs):
     os.makedirs(components_dir, exist_ok=True)
     component_name = kwargs.pop("component_name")
     commit_changes = kwargs.pop("commit_changes")
 
     if subparser == "get":
         component = c_lib.Component.from_file(
-            component_name, components_dir
+            component_name, components_dir, cache
         )
     elif subparser == "add":
-        import_releases = kwargs.pop("import_releases", [])
         try:
-            component = c_lib.Component.from_file(
-                component_name, components_dir
-            )
+            c_lib.Component.from_file(component_name, components_dir, cache)
         except c_lib.ComponentError:
             pass
         else:
@@ -40,35 +50,12 @@ def component(releases_dir, components_dir, subparser, **kwargs):
                 )
             )
 
-        ssh_url = c_lib.git_http_to_ssh(kwargs["repo_url"])
-        with TemporaryDirectory() as tmp_dir:
-            try:
-                repo = git.Repo.clone_from(ssh_url, tmp_dir)
-            except FileNotFoundError as e:
-                raise c_lib.ComponentError(
-                    "The repo_url provided is inaccessible, please check."
-                )
-            else:
-                repo.remotes.origin.fetch()
-                releases = []
-                for each in import_releases:
-                    series, tag_regex = each.split(":", 1)
-                    for tag in repo.tags:
-                        if re.search(tag_regex, tag.name):
-                            releases.append(
-                                {
-                                    "version": tag.name,
-                                    "sha": str(tag.commit),
-                                    "series": series,
-                                }
-                            )
-        component = c_lib.Component(
-            name=component_name, directory=components_dir,
-            releases=releases, **kwargs
+        component = new_component(
+            component_name, components_dir, **kwargs
         )
     elif subparser == "update":
         component = c_lib.Component.from_file(
-            component_name, components_dir
+            component_name, components_dir, cache
         )
         if kwargs["new_name"]:
             component.name = kwargs["new_name"]
@@ -95,15 +82,46 @@ def component(releases_dir, components_dir, subparser, **kwargs):
     return component
 
 
-def release(releases_dir, components_dir, **kwargs):
+def new_component(component_name, components_dir, repo_url, is_product,
+                  import_releases=()):
+    ssh_url = c_lib.git_http_to_ssh(repo_url)
+    try:
+        tags = c_lib.remote_tags(ssh_url)
+    except (FileNotFoundError, git.exc.GitCommandError):
+        raise c_lib.ComponentError(
+            "The repo_url provided is inaccessible, please check."
+        )
+    import_patterns = []
+    for each in import_releases:
+        series, tag_regex = each.split(":", 1)
+        import_patterns.append((series, re.compile(tag_regex)))
+    releases = [
+        {
+            "version": tag_name,
+            "sha": sha,
+            "series": series,
+        }
+        for tag_name, sha in tags
+        for series, pattern in import_patterns
+        if pattern.search(tag_name)
+    ]
+    return c_lib.Component(
+        name=component_name, directory=components_dir, repo_url=repo_url,
+        is_product=is_product, releases=releases,
+    )
+
+
+def release(releases_dir, components_dir, cache=None, **kwargs):
     component_name = kwargs.pop("component_name")
     commit_changes = kwargs.pop("commit_changes")
     subparser = kwargs.pop("release_subparser")
     component = c_lib.Component.from_file(
-        component_name, components_dir
+        component_name, components_dir, cache
     )
     if subparser == "get":
-        release = component.get_release(kwargs["version"], kwargs["pred"])
+        release = component.get_release(
+            kwargs["version"], kwargs["pred"], kwargs["succ"]
+        )
     elif subparser == "add":
         release = component.create_release(
             version=kwargs["version"],
@@ -128,12 +146,12 @@ def release(releases_dir, components_dir, **kwargs):
     return release
 
 
-def artifact_store(releases_dir, components_dir, **kwargs):
+def artifact_store(releases_dir, components_dir, cache=None, **kwargs):
     component_name = kwargs.pop("component_name")
     commit_changes = kwargs.pop("commit_changes")
     subparser = kwargs.pop("artifact_store_subparser")
     component = c_lib.Component.from_file(
-        component_name, components_dir
+        component_name, components_dir, cache
     )
     if subparser == "get":
         store = component.get_artifact_store(kwargs["name"])
@@ -162,12 +180,133 @@ def artifact_store(releases_dir, components_dir, **kwargs):
     return store
 
 
-def compare(releases_dir, components_dir, **kwargs):
-    from_ = c_lib.load_all_components(
-        components_dir, releases_dir, kwargs["from"]
-    )
-    to = c_lib.load_all_components(
-        components_dir, releases_dir, kwargs["to"]
+def batch(releases_dir, components_dir, cache=None, **kwargs):
+    """Apply a stream of operations and commit the changes at once.
+
+    All of the operations are applied in memory before any component file is
+    written, so an invalid operation leaves the releases repo untouched. The
+    result of each operation is captured as it is applied, later operations
+    in the batch do not change it.
+    """
+    os.makedirs(components_dir, exist_ok=True)
+    commit_changes = kwargs.pop("commit_changes")
+    with kwargs["file"] as f:
+        operations = s_lib.batch_schema.validate(c_lib.parse_data(f) or [])
+
+    components = {}
+    # Names that components were renamed from, their files are removed when
+    # the renamed components are written so the names cannot be reused
+    # within the batch.
+    renamed = set()
+
+    def check_unused(name):
+        if name in renamed:
+            raise c_lib.ComponentError(
+                "Component '{name}' was renamed earlier in the batch, its "
+                "name cannot be reused.".format(name=name)
+            )
+        if name in components or os.path.exists(
+            os.path.join(components_dir, "{n}.yml".format(n=name))
+        ):
+            raise c_lib.ComponentError(
+                "Component '{name}' already exists.".format(name=name)
+            )
+
+    def get_component(name):
+        try:
+            return components[name]
+        except KeyError:
+            pass
+        if name in renamed:
+            raise c_lib.ComponentError(
+                "Component '{name}' could not be found.".format(name=name)
+            )
+        component = c_lib.Component.from_file(name, components_dir, cache)
+        components[name] = component
+        return component
+
+    results = []
+    messages = []
+    for operation in operations:
+        op = operation.pop("operation")
+        component_name = operation.pop("component_name")
+        if op == "add":
+            check_unused(component_name)
+            component = new_component(
+                component_name, components_dir, **operation
+            )
+            components[component_name] = component
+            result = deepcopy(component.to_dict())
+            msg = "Add component {name}".format(name=component_name)
+        elif op == "update":
+            component = get_component(component_name)
+            new_name = operation.get("new_name")
+            if new_name and new_name != component_name:
+                check_unused(new_name)
+                component.name = new_name
+                del components[component_name]
+                components[new_name] = component
+                renamed.add(component_name)
+            if operation.get("repo_url"):
+                component.repo_url = operation["repo_url"]
+            if "is_product" in operation:
+                component.is_product = operation["is_product"]
+            result = deepcopy(component.to_dict())
+            msg = "Update component {name}".format(name=component.name)
+        elif op == "release-add":
+            component = get_component(component_name)
+            release = component.create_release(
+                version=operation["version"],
+                sha=operation["sha"],
+                series=operation["series_name"],
+            )
+            result = deepcopy(release.to_dict())
+            msg = "Add component {name} release {version}".format(
+                name=component.name,
+                version=release.version,
+            )
+        elif op == "artifact-store-add":
+            component = get_component(component_name)
+            result = dict(
+                component.add_artifact_store(
+                    name=operation["name"],
+                    store_type=operation["type"],
+                    public_url=operation["public_url"],
+                    description=operation["description"],
+                )
+            )
+            msg = "Add component {name} artifact store {store_name}".format(
+                name=component.name,
+                store_name=result["name"],
+            )
+        results.append(result)
+        messages.append(msg)
+
+    changed = [c for c in components.values() if c._is_changed]
+    # Validate every component before the first file is written.
+    for component in changed:
+        component.to_dict()
+    for component in changed:
+        component.to_file()
+
+    if commit_changes and changed:
+        if len(messages) == 1:
+            msg = messages[0]
+        else:
+            msg = "Apply {n} component operations\n\n{details}".format(
+                n=len(messages),
+                details="\n".join(messages),
+            )
+        c_lib.commit_changes(releases_dir, components_dir, msg)
+
+    return results
+
+
+def compare(releases_dir, components_dir, cache=None, workers=None,
+            **kwargs):
+    from_, to = c_lib.load_changed_components(
+        components_dir, releases_dir, kwargs["from"], kwargs["to"], cache,
+        workers,
     )
     to_compare = defaultdict(lambda: [{}, {}])
     for c in from_:
@@ -188,11 +327,11 @@ def compare(releases_dir, components_dir, **kwargs):
         if added or deleted:
             comparison[name] = {"added": added, "deleted": deleted}
 
-    comparison_yaml = yaml.dump(comparison, default_flow_style=False)
+    comparison_yaml = c_lib.dump_data(comparison)
     if kwargs["verify"] == "release":
         try:
             s_lib.comparison_added_version_schema.validate(comparison)
-        except SchemaError as e:
+        except schema.SchemaError as e:
             raise c_lib.ComponentError(
                 "The changes from `{f}` to `{t}` do not represent the "
                 "addition of a new release.\nValidation error:"
@@ -211,7 +350,7 @@ def compare(releases_dir, components_dir, **kwargs):
     elif kwargs["verify"] == "registration":
         try:
             s_lib.comparison_added_component_schema.validate(comparison)
-        except SchemaError as e:
+        except schema.SchemaError as e:
             raise c_lib.ComponentError(
                 "The changes from `{f}` to `{t}` do not represent the "
                 "registration of a new component.\nValidation error:"
@@ -229,7 +368,7 @@ def compare(releases_dir, components_dir, **kwargs):
     elif kwargs["verify"] == "artifact-store":
         try:
             s_lib.comparison_added_artifact_stores_schema.validate(comparison)
-        except SchemaError as e:
+        except schema.SchemaError as e:
             raise c_lib.ComponentError(
                 "The changes from `{f}` to `{t}` do not represent the "
                 "addition of one or more new artifact stores.\nValidation "
@@ -249,10 +388,10 @@ def compare(releases_dir, components_dir, **kwargs):
     return output
 
 
-def dependency(components_dir, **kwargs):
+def dependency(components_dir, cache=None, verbose=False, **kwargs):
     dependency_dir = kwargs.pop("dependency_dir")
     commit_changes = kwargs.pop("commit_changes")
-    metadata_filename = "component_metadata.yml"
+    metadata_filename = c_lib.METADATA_FILENAME
     filepath = os.path.join(dependency_dir, metadata_filename)
     new_metadata = {"artifacts": [], "dependencies": []}
     metadata = get_metadata(dependency_dir)
@@ -272,8 +411,14 @@ def dependency(components_dir, **kwargs):
 
                 c_lib.commit_changes(dependency_dir, metadata_filename, msg)
     elif subparser == "update-requirements":
+        branch_ttl = kwargs.pop("branch_cache_ttl")
+        if kwargs.pop("refresh_branch_cache"):
+            branch_ttl = 0
         existing_requirements = c_lib.load_requirements(dependency_dir)
-        requirements = c_lib.update_requirements(metadata, components_dir)
+        requirements = c_lib.update_requirements(
+            metadata, components_dir, cache,
+            cache_lib.branch_cache(branch_ttl),
+        )
         if existing_requirements != requirements:
             c_lib.save_requirements(requirements, dependency_dir)
             if commit_changes:
@@ -283,9 +428,19 @@ def dependency(components_dir, **kwargs):
                 )
     elif subparser == "download-requirements":
         requirements = c_lib.load_requirements(dependency_dir)
-        c_lib.download_requirements(
-            requirements["dependencies"], kwargs["download_dir"]
+        fetches_avoided = c_lib.download_requirements(
+            requirements["dependencies"], kwargs["download_dir"],
+            kwargs["jobs"], kwargs["shallow"] or kwargs["blobless"],
+            kwargs["blobless"],
         )
+        if verbose:
+            log(
+                "Skipped {n} of {total} fetches, the pinned commits were "
+                "already present.".format(
+                    n=fetches_avoided,
+                    total=len(requirements["dependencies"]),
+                )
+            )
     else:
         raise c_lib.ComponentError(
             "The dependency subparser '{sp}' is not recognised.".format(
@@ -294,35 +449,25 @@ def dependency(components_dir, **kwargs):
         )
 
 
-def dependents(my_component_name, download_dir, releases_dir, components_dir):
-    dependents_list = []
-    components = c_lib.load_all_components(components_dir, releases_dir)
-    for component in components:
-        if len(component.releases) > 0:
-            series_list = []
-            for release in component.releases:
-                if release.series not in series_list:
-                    series_list.append(release.series)
-                    component_parameters = [{"name": component.name, "repo_url": component.repo_url,
-                                             "series": release.series, "sha": None}]
-                    c_lib.download_components(component_parameters, download_dir)
-                    dep_component_dir = os.path.join(download_dir, component.name)
-                    metadata = get_metadata(dep_component_dir)
-                    if metadata:
-                        for dependency in metadata['dependencies']:
-                            if dependency['name'] == my_component_name:
-                                dependents_list.append(component)
-    return dependents_list
+def dependents(my_component_name, download_dir, releases_dir, components_dir,
+               cache=None, workers=None, refresh=True):
+    components = c_lib.load_all_components(
+        components_dir, releases_dir, cache=cache, workers=workers
+    )
+    index = c_lib.load_dependents_index()
+    # Without a refresh, components missing from the index are still
+    # indexed so that they are not silently reported as having no
+    # dependencies.
+    c_lib.update_dependents_index(
+        index, components, missing_only=not refresh
+    )
+    c_lib.save_dependents_index(index)
+
+    return c_lib.find_dependents(index, components, my_component_name)
 
 
 def get_metadata(metadata_dir):
-    metadata_filename = "component_metadata.yml"
-    filepath = os.path.join(metadata_dir, metadata_filename)
-    try:
-        metadata = c_lib.load_data(filepath)
-    except FileNotFoundError:
-        metadata = {"artifacts": [], "dependencies": [], "jenkins": {}}
-    return s_lib.component_metadata_schema.validate(metadata)
+    return c_lib.load_metadata(metadata_dir)
 
 
 def metadata(components_dir, **kwargs):
@@ -338,21 +483,63 @@ def metadata(components_dir, **kwargs):
         )
 
 
-def update_releases_repo(repo_url):
-    repo_dir = os.path.expanduser("~/.rpc_component/releases")
+def update_releases_repo(repo_url, sync_interval=0, sync=True,
+                         verbose=False):
+    """Return the path of the local releases clone, updating it if stale.
+
+    Local changes to an existing clone are always discarded and master is
+    checked out, but it is pulled only when `sync` is set and it has not
+    been synced within the last `sync_interval` seconds.
+    """
+    repo_dir = os.path.expanduser(
+        os.path.join(cache_lib.CACHE_DIR, "releases")
+    )
+    stamp_path = "{d}.last_sync".format(d=repo_dir)
+    try:
+        last_sync = os.stat(stamp_path).st_mtime
+    except FileNotFoundError:
+        last_sync = None
+
     try:
         repo = git.Repo(repo_dir)
     except git.exc.NoSuchPathError:
+        if not sync:
+            raise c_lib.ComponentError(
+                "The releases repo has not been cloned to '{d}', it cannot be "
+                "used without syncing.".format(d=repo_dir)
+            )
         os.makedirs(repo_dir, exist_ok=True)
         repo = git.Repo.clone_from(repo_url, repo_dir, branch="master")
+        last_sync = touch(stamp_path)
     else:
         repo.head.reset(index=True, working_tree=True)
         repo.heads.master.checkout()
-        repo.remote("origin").pull()
+        if sync and (
+            last_sync is None or time.time() - last_sync >= sync_interval
+        ):
+            repo.remote("origin").pull()
+            last_sync = touch(stamp_path)
+
+    if verbose:
+        log(
+            "Releases repo last synced: {t}".format(
+                t=time.ctime(last_sync) if last_sync else "unknown"
+            )
+        )
 
     return repo_dir
 
 
+def touch(path):
+    with open(path, "a"):
+        os.utime(path)
+    return os.stat(path).st_mtime
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
 def parse_args(args):
     parser = argparse.ArgumentParser()
 
@@ -371,6 +558,23 @@ def parse_args(args):
                 "and no previous clone exists."
         ),
     )
+    parser.add_argument(
+        "--sync-interval",
+        type=int,
+        default=0,
+        help=(
+            "Pull the cloned releases repo only if it was last synced more "
+            "than this many seconds ago (default=0)."
+        ),
+    )
+    parser.add_argument(
+        "--no-sync",
+        "--offline",
+        dest="no_sync",
+        default=False,
+        action="store_true",
+        help="Use the cloned releases repo without pulling it.",
+    )
     parser.add_argument(
         "--no-commit-changes",
         default=False,
@@ -381,6 +585,37 @@ def parse_args(args):
         ),
     )
 
+    parser.add_argument(
+        "--verbose",
+        default=False,
+        action="store_true",
+        help="Report additional information on stderr.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        default=False,
+        action="store_true",
+        help=(
+            "Do not use the cache of parsed component files kept in "
+            "~/.rpc_component/components."
+        ),
+    )
+    parser.add_argument(
+        "--clear-cache",
+        default=False,
+        action="store_true",
+        help="Remove all entries from the parsed component file cache.",
+    )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of processes used to parse and validate component files "
+            "when loading the whole catalogue (default=1)."
+        ),
+    )
+
     subparsers = parser.add_subparsers(dest="subparser")
     subparsers.required = True
 
@@ -399,7 +634,7 @@ def parse_args(args):
     )
     ca_parser.add_argument(
         "--repo-url",
-        type=s_lib.repo_url_schema.validate,
+        type=schema_type("repo_url_schema"),
         required=True,
         help="Component repository URL.",
     )
@@ -427,7 +662,7 @@ def parse_args(args):
     )
     cu_parser.add_argument(
         "--repo-url",
-        type=s_lib.repo_url_schema.validate,
+        type=schema_type("repo_url_schema"),
         required=True,
         help="Component repository URL.",
     )
@@ -452,23 +687,30 @@ def parse_args(args):
         help="Get a single version.",
         required=True,
     )
-    rg_parser.add_argument(
+    rg_neighbour = rg_parser.add_mutually_exclusive_group()
+    rg_neighbour.add_argument(
         "--pred",
         default=False,
         action="store_true",
         help="Get the predecessor of a single version.",
     )
+    rg_neighbour.add_argument(
+        "--succ",
+        default=False,
+        action="store_true",
+        help="Get the successor of a single version.",
+    )
 
     ra_parser = r_subparser.add_parser("add")
     ra_parser.add_argument(
         "--version",
-        type=s_lib.version_id_schema.validate,
+        type=schema_type("version_id_schema"),
         required=True,
         help="The version identifier for the new release, e.g. 1.0.0.",
     )
     ra_parser.add_argument(
         "--sha",
-        type=s_lib.version_sha_schema.validate,
+        type=schema_type("version_sha_schema"),
         required=True,
         help="The hash of the commit to be tagged with the specified version.",
     )
@@ -516,6 +758,20 @@ def parse_args(args):
         help="Description of the artifact store.",
     )
 
+    b_parser = subparsers.add_parser(
+        "batch",
+        help=(
+            "Apply a YAML or JSON list of add, update, release-add and "
+            "artifact-store-add operations and commit the result once."
+        ),
+    )
+    b_parser.add_argument(
+        "--file",
+        type=argparse.FileType("r"),
+        default="-",
+        help="File containing the operations (default=stdin).",
+    )
+
     dep_parser = subparsers.add_parser("dependency")
     dep_parser.add_argument(
         "--dependency-dir",
@@ -533,6 +789,21 @@ def parse_args(args):
             "versions/commits."
         ),
     )
+    req_parser.add_argument(
+        "--branch-cache-ttl",
+        type=int,
+        default=0,
+        help=(
+            "Reuse branch heads resolved by a previous run within this many "
+            "seconds, cached in ~/.rpc_component/branches (default=0)."
+        ),
+    )
+    req_parser.add_argument(
+        "--refresh-branch-cache",
+        default=False,
+        action="store_true",
+        help="Resolve every branch head from its remote, ignoring the TTL.",
+    )
 
     sd_parser = dep_subparsers.add_parser("set-dependency")
     sd_parser.add_argument(
@@ -556,6 +827,30 @@ def parse_args(args):
         default="./",
         help="The dependency component repo is cloned to this path (default=./)"
     )
+    dl_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of requirements to download concurrently (default=1).",
+    )
+    dl_parser.add_argument(
+        "--shallow",
+        default=False,
+        action="store_true",
+        help=(
+            "Fetch only each pinned commit, without history, directly from "
+            "the dependency's repository."
+        ),
+    )
+    dl_parser.add_argument(
+        "--blobless",
+        default=False,
+        action="store_true",
+        help=(
+            "As --shallow, and fetch file contents only as the checkout "
+            "needs them."
+        ),
+    )
 
     dt_parser = subparsers.add_parser("dependents")
     dt_parser.add_argument(
@@ -566,7 +861,21 @@ def parse_args(args):
     dt_parser.add_argument(
         "--download-dir",
         default="./",
-        help="Path to clone component repos while checking for dependents (default=./)"
+        help=(
+            "Unused, component metadata is now read from the repository "
+            "mirrors in ~/.rpc_component/mirrors."
+        ),
+    )
+
+    dt_parser.add_argument(
+        "--no-refresh",
+        default=False,
+        action="store_true",
+        help=(
+            "Answer from the dependents index in ~/.rpc_component without "
+            "checking whether any series head has moved. Components missing "
+            "from the index are still indexed."
+        ),
     )
 
     dt_subparsers = dt_parser.add_subparsers(dest="dependents_subparser")
@@ -606,47 +915,69 @@ def parse_args(args):
 
 def main():
     raw_args = sys.argv[1:]
+    kwargs = parse_args(raw_args)
     try:
-        kwargs = parse_args(raw_args)
         kwargs["commit_changes"] = not kwargs.pop("no_commit_changes")
+        cache = None if kwargs.pop("no_cache") else cache_lib.component_cache()
+        if kwargs.pop("clear_cache"):
+            cache_lib.component_cache().clear()
+        workers = kwargs.pop("load_workers")
+        verbose = kwargs.pop("verbose")
 
         subparser = kwargs.pop("subparser")
 
         releases_repo = kwargs.pop("releases_repo")
+        sync_interval = kwargs.pop("sync_interval")
+        no_sync = kwargs.pop("no_sync")
         releases_dir = os.path.expanduser(kwargs.pop("releases_dir") or "")
         if not releases_dir:
-            releases_dir = update_releases_repo(repo_url=releases_repo)
+            releases_dir = update_releases_repo(
+                repo_url=releases_repo,
+                sync_interval=sync_interval,
+                sync=not no_sync,
+                verbose=verbose,
+            )
 
         components_dir = os.path.join(releases_dir, "components")
 
         if subparser in ("get", "add", "update"):
             resp = component(
-                releases_dir, components_dir, subparser, **kwargs
+                releases_dir, components_dir, subparser, cache, **kwargs
             )
         elif subparser == "release":
-            resp = release(releases_dir, components_dir, **kwargs)
+            resp = release(releases_dir, components_dir, cache, **kwargs)
         elif subparser == "artifact-store":
-            resp = artifact_store(releases_dir, components_dir, **kwargs)
+            resp = artifact_store(
+                releases_dir, components_dir, cache, **kwargs
+            )
+        elif subparser == "batch":
+            resp = batch(releases_dir, components_dir, cache, **kwargs)
         elif subparser == "dependency":
-            resp = dependency(components_dir, **kwargs)
+            resp = dependency(components_dir, cache, verbose, **kwargs)
         elif subparser == "dependents":
-            resp = dependents(kwargs["component_name"], kwargs["download_dir"], releases_dir, components_dir)
+            resp = dependents(
+                kwargs["component_name"], kwargs["download_dir"],
+                releases_dir, components_dir, cache, workers,
+                not kwargs["no_refresh"],
+            )
         elif subparser == "compare":
-            resp = compare(releases_dir, components_dir, **kwargs)
+            resp = compare(
+                releases_dir, components_dir, cache, workers, **kwargs
+            )
         elif subparser == "metadata":
             resp = metadata(components_dir, **kwargs)
         else:
             raise c_lib.ComponentError(
                 "The subparser '{sp}' is not recognised.".format(sp=subparser)
             )
-    except SchemaError as e:
+    except schema.SchemaError as e:
         error_message = e.code
     except c_lib.ComponentError as e:
         error_message = e
     else:
         error_message = None
         if resp is not None:
-            print(yaml.dump(resp, default_flow_style=False), end="")
+            print(c_lib.dump_data(resp), end="")
 
     sys.exit(error_message)
 
@@ -1,134 +1,155 @@
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from copy import deepcopy
-from functools import total_ordering
+from functools import partial, total_ordering
+import hashlib
+import json
 from itertools import groupby, takewhile
 from operator import attrgetter, eq, ge, gt, le, lt, ne
 import os
 import re
-from tempfile import TemporaryDirectory
+import threading
 
-import git
 from schema import SchemaError
 import yaml
 
+from rpc_component._lazy import lazy_import
+from rpc_component.cache import CACHE_DIR
 from rpc_component.schemata import (
     constraint_key, component_metadata_schema, component_requirements_schema,
     component_schema, component_single_version_schema, branch_constraint_regex,
     branch_constraints_schema, version_constraint_regex, version_regex,
-    version_key,
+    Version,
 )
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Only commands working with repositories need GitPython.
+git = lazy_import("git")
+
 REQUIREMENTS_FILENAME = "component_requirements.yml"
+METADATA_FILENAME = "component_metadata.yml"
+# Below this many files, starting a process pool costs more than it saves.
+PARALLEL_LOAD_THRESHOLD = 32
+MIRROR_DIR = os.path.join(CACHE_DIR, "mirrors")
+DEPENDENTS_INDEX_PATH = os.path.join(CACHE_DIR, "dependents.json")
+
+_mirror_locks = {}
+_mirror_locks_lock = threading.Lock()
+_updated_mirrors = set()
+
+
+class Dumper(yaml.SafeDumper):
+    """Safe YAML dumper producing the same output as `yaml.dump`.
+
+    libyaml folds long double-quoted scalars differently from the pure
+    Python emitter, so it is only used for loading. Component dictionaries
+    are cached and may be emitted more than once in a document so aliases
+    are never used, keeping output plain.
+    """
+
+    def ignore_aliases(self, data):
+        return True
 
 
 class Component(yaml.YAMLObject):
     schema = component_schema
+    # Assigning a new value to any of these marks the component as changed.
+    # Artifact stores are plain dictionaries that callers may also edit in
+    # place, so they are compared with their state when loaded as well.
+    _serialized_fields = (
+        "name", "repo_url", "is_product", "releases", "artifact_stores",
+    )
 
     def __init__(
             self, name, repo_url, is_product, releases=None, directory=None,
             artifact_stores=None,
             ):
+        self._dict_cache = None
+        self._changed = True
+        self._orig_name = None
+        self._orig_artifact_stores = None
         self.name = name
         self.repo_url = repo_url
         self.is_product = is_product
-        self.releases = []
+        self.releases = ReleaseList()
         for release in releases or []:
             self.create_release(**release)
         self.directory = directory
-        self._orig_state = None
         self.artifact_stores = artifact_stores or []
 
+    def __setattr__(self, name, value):
+        if (
+            name in self._serialized_fields and
+            getattr(self, name, None) != value
+        ):
+            self._touch()
+        super().__setattr__(name, value)
+
+    def _touch(self):
+        self._dict_cache = None
+        self._changed = True
+
     def create_release(self, version, sha, series):
         release = Release(self, version, sha, series)
         return release
 
     def add_release(self, release):
-        version = release.version
-        try:
-            self.get_release(version)
-        except ComponentError:
-            releases = self.releases + [release]
-            self.releases = sorted(releases, reverse=True)
-        else:
+        self.releases.add(release)
+        self._touch()
+
+    def get_release(self, version, predecessor=False, successor=False):
+        if predecessor and successor:
             raise ComponentError(
-                "Release with version {v} already exists.".format(v=version)
+                "Only one of predecessor and successor can be requested."
             )
-
-    def get_release(self, version, predecessor=False):
+        position = self.releases.position(version)
         if predecessor:
-            pred = None
-            for r in reversed(self.releases):
-                if r.version == version:
-                    if pred:
-                        release = pred
-                        break
-                    else:
-                        raise ComponentError(
-                            "Release with version {v} does not have a "
-                            "predecessor.".format(v=version)
-                        )
-                else:
-                    pred = r
-            else:
+            position += 1
+            if position == len(self.releases):
                 raise ComponentError(
-                    "Release with version {v} does not exist".format(v=version)
+                    "Release with version {v} does not have a "
+                    "predecessor.".format(v=version)
                 )
-        else:
-            for release in self.releases:
-                if release.version == version:
-                    break
-            else:
+        elif successor:
+            position -= 1
+            if position < 0:
                 raise ComponentError(
-                    "Release with version {v} does not exist".format(v=version)
+                    "Release with version {v} does not have a "
+                    "successor.".format(v=version)
                 )
 
-        return release
+        return self.releases[position]
 
     def difference(self, other):
         """Return difference, where in self but not in other."""
-        def _difference(a, b):
-            """In a but not b"""
-            diff = {}
-            for k, av in a.items():
-                try:
-                    bv = b[k]
-                except KeyError:
-                    diff[k] = av
+        a = self.to_dict()
+        b = other.to_dict()
+        diff = {}
+        for k, av in a.items():
+            try:
+                bv = b[k]
+            except KeyError:
+                diff[k] = av
+            else:
+                if av == bv:
+                    continue
+                elif k == "releases":
+                    value_diff = _releases_difference(av, bv)
+                    if value_diff:
+                        diff[k] = value_diff
+                elif k == "artifact_stores":
+                    value_diff = _keyed_difference(av, bv, "name")
+                    if value_diff:
+                        diff[k] = value_diff
                 else:
-                    if av == bv:
-                        continue
-                    elif k == "releases":
-                        release_pairs = defaultdict(lambda: [{}, {}])
-                        for r in av:
-                            release_pairs[r["series"]][0] = r
-                        for r in bv:
-                            release_pairs[r["series"]][1] = r
-
-                        value_diff = []
-                        for avv, bvv in release_pairs.values():
-                            sub_value_diff = _difference(avv, bvv)
-                            if sub_value_diff:
-                                value_diff.append(sub_value_diff)
-
-                        if value_diff:
-                            diff[k] = value_diff
-                    elif isinstance(av, dict):
-                        value_diff = _difference(av, bv)
-                        if value_diff:
-                            diff[k] = value_diff
-                    elif isinstance(av, list):
-                        value_diff = []
-                        for avv in av:
-                            if avv not in bv:
-                                value_diff.append(avv)
-
-                        if value_diff:
-                            diff[k] = value_diff
-                    else:
-                        diff[k] = av
-
-            return diff
-        return _difference(self.to_dict(), other.to_dict())
+                    diff[k] = av
+
+        return diff
 
     def get_artifact_store(self, name):
         for store in self.artifact_stores:
@@ -146,15 +167,28 @@ class Component(yaml.YAMLObject):
             "description": description,
         }
         self.artifact_stores.append(store)
+        self._touch()
         return store
 
     @property
     def _is_changed(self):
-        current_state = vars(self).copy()
-        del current_state["_orig_state"]
-        return current_state != self._orig_state
+        return (
+            self._changed or
+            self.artifact_stores != self._orig_artifact_stores
+        )
 
     def to_dict(self):
+        """Return the validated dictionary representation of the component.
+
+        The result is cached until the component is next changed, callers
+        must not modify it.
+        """
+        if (
+            self._dict_cache is not None and
+            self._dict_cache["artifact_stores"] == self.artifact_stores
+        ):
+            return self._dict_cache
+
         component = {
             "name": self.name,
             "repo_url": self.repo_url,
@@ -169,7 +203,8 @@ class Component(yaml.YAMLObject):
             ],
             "artifact_stores": self.artifact_stores,
         }
-        return self.schema.validate(component)
+        self._dict_cache = self.schema.validate(component)
+        return self._dict_cache
 
     yaml_tag = ""
 
@@ -178,27 +213,35 @@ class Component(yaml.YAMLObject):
             return representer.represent_dict(data.to_dict())
 
     @classmethod
-    def from_file(cls, component_name, component_directory):
+    def from_file(cls, component_name, component_directory, cache=None):
         filename = "{name}.yml".format(name=component_name)
         filepath = os.path.join(component_directory, filename)
 
         try:
-            component_data = cls.schema.validate(load_data(filepath))
+            component_data = load_component_data(filepath, cache)
         except FileNotFoundError:
             raise ComponentError(
                 "Component '{name}' could not be found.".format(
                     name=component_name,
                 )
             )
-        else:
-            component_data["releases"] = [
-                dict(release, series=series["series"])
-                for series in component_data["releases"]
-                for release in series["versions"]
-            ]
-            component = cls(directory=component_directory, **component_data)
-            component._orig_state = deepcopy(vars(component))
-            del component._orig_state["_orig_state"]
+
+        return cls.from_data(component_data, component_directory)
+
+    @classmethod
+    def from_data(cls, component_data, component_directory):
+        """Create an unchanged component from validated component data."""
+        component_data["releases"] = [
+            dict(release, series=series["series"])
+            for series in component_data["releases"]
+            for release in series["versions"]
+        ]
+        component = cls(directory=component_directory, **component_data)
+        component._changed = False
+        component._orig_name = component.name
+        component._orig_artifact_stores = [
+            dict(store) for store in component.artifact_stores
+        ]
 
         return component
 
@@ -206,10 +249,7 @@ class Component(yaml.YAMLObject):
         if self._is_changed:
             filename = "{name}.yml".format(name=self.name)
             filepath = os.path.join(self.directory, filename)
-            if self._orig_state:
-                orig_name = self._orig_state["name"]
-            else:
-                orig_name = None
+            orig_name = self._orig_name
             if orig_name and self.name != orig_name:
                 old_filename = "{name}.yml".format(name=orig_name)
                 old_filepath = os.path.join(self.directory or "", old_filename)
@@ -227,6 +267,7 @@ class Release(yaml.YAMLObject):
     def __init__(self, component, version, sha, series):
         self.component = component
         self.version = version
+        self.parsed_version = Version(version)
         self.sha = sha
         self.series = series
         self.component.add_release(self)
@@ -238,17 +279,22 @@ class Release(yaml.YAMLObject):
         return str(self) == str(other)
 
     def __lt__(self, other):
-        return version_key(self.version) < version_key(other.version)
+        return self.parsed_version < other.parsed_version
 
     yaml_tag = ""
 
     def to_dict(self):
-        release = self.component.to_dict()
-        del release["releases"]
-        release["release"] = {
-            "series": self.series,
-            "version": self.version,
-            "sha": self.sha,
+        component = self.component
+        release = {
+            "name": component.name,
+            "repo_url": component.repo_url,
+            "is_product": component.is_product,
+            "release": {
+                "series": self.series,
+                "version": self.version,
+                "sha": self.sha,
+            },
+            "artifact_stores": component.artifact_stores,
         }
         return self.schema.validate(release)
 
@@ -257,14 +303,120 @@ class Release(yaml.YAMLObject):
             return representer.represent_dict(data.to_dict())
 
 
+class ReleaseList(Sequence):
+    """Releases ordered from newest to oldest version.
+
+    Each release's sort key is computed once on insertion and new releases
+    are placed by binary search, so adding releases that are already in
+    order, as they are when read from a component file, is linear overall.
+    A version to position index answers lookups in constant time, it is
+    rebuilt lazily only after a release is inserted out of order.
+    """
+
+    def __init__(self, releases=None):
+        self._releases = []
+        # Negated version keys, which are ascending when releases descend.
+        self._keys = []
+        self._positions = {}
+        for release in releases or []:
+            self.add(release)
+
+    def add(self, release):
+        version = release.version
+        key = tuple(-k for k in release.parsed_version.key)
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key, lo)
+        if any(r.version == version for r in self._releases[lo:hi]):
+            raise ComponentError(
+                "Release with version {v} already exists.".format(v=version)
+            )
+        if hi == len(self._releases):
+            if self._positions is not None:
+                self._positions[version] = hi
+        else:
+            self._positions = None
+        self._keys.insert(hi, key)
+        self._releases.insert(hi, release)
+
+    def position(self, version):
+        if self._positions is None:
+            self._positions = {
+                r.version: i for i, r in enumerate(self._releases)
+            }
+        try:
+            return self._positions[version]
+        except KeyError:
+            raise ComponentError(
+                "Release with version {v} does not exist".format(v=version)
+            )
+
+    def __getitem__(self, index):
+        return self._releases[index]
+
+    def __len__(self):
+        return len(self._releases)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return self._releases == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{cls}({releases!r})".format(
+            cls=type(self).__name__, releases=self._releases
+        )
+
+
+def _keyed_difference(a, b, key):
+    """Return the items of `a` not in `b`, items are unique on `key`."""
+    b_items = {item[key]: item for item in b}
+    return [item for item in a if b_items.get(item[key]) != item]
+
+
+def _releases_difference(a, b):
+    """Return the versions in releases `a` but not in `b`.
+
+    A series missing from `b` is returned whole, otherwise only the versions
+    missing from the same series in `b` are returned, without the series.
+    """
+    b_series = {r["series"] for r in b}
+    b_versions = {
+        (r["series"], v["version"]): v for r in b for v in r["versions"]
+    }
+    diff = []
+    for r in a:
+        series = r["series"]
+        if series not in b_series:
+            diff.append(dict(r))
+            continue
+        versions = [
+            v for v in r["versions"]
+            if b_versions.get((series, v["version"])) != v
+        ]
+        if versions:
+            diff.append({"versions": versions})
+
+    return diff
+
+
+Dumper.add_representer(Component, Component.to_yaml)
+Dumper.add_representer(Release, Release.to_yaml)
+
+
 class ComponentError(Exception):
     pass
 
 
 def load_data(filepath):
+    with open(filepath) as f:
+        return parse_data(f)
+
+
+def parse_data(stream):
     try:
-        with open(filepath) as f:
-            data = yaml.safe_load(f)
+        data = yaml.load(stream, Loader=SafeLoader)
     except yaml.parser.ParserError as e:
         raise ComponentError(
             "Invalid YAML:"
@@ -277,7 +429,7 @@ def load_data(filepath):
 
 def save_data(filepath, data, old_filepath=None, header=None):
     with open(filepath, "w") as f:
-        enc_data = yaml.dump(data, default_flow_style=False)
+        enc_data = dump_data(data)
         if header:
             o = "# {comment}\n{data}".format(comment=header, data=enc_data)
         else:
@@ -288,24 +440,161 @@ def save_data(filepath, data, old_filepath=None, header=None):
         os.remove(old_filepath)
 
 
-def load_all_components(component_dir, repo_dir, commitish=None):
-    repo = git.Repo(repo_dir)
-    start_ref = repo.head.commit
+def load_component_data(filepath, cache=None):
+    """Load and validate component data.
+
+    With a `cache`, data is keyed on the file's path, modification time and
+    size so an unchanged file is neither parsed nor validated again.
+    """
+    if cache is None:
+        return Component.schema.validate(load_data(filepath))
+
+    stat = os.stat(filepath)
+    key = "component:{path}:{mtime}:{size}".format(
+        path=os.path.abspath(filepath),
+        mtime=stat.st_mtime_ns,
+        size=stat.st_size,
+    )
+    data = cache.get(key)
+    if data is None:
+        data = Component.schema.validate(load_data(filepath))
+        cache.set(key, data)
+
+    return data
+
+
+def _parse_component_blob(blob_data):
+    return Component.schema.validate(parse_data(blob_data))
+
+
+def dump_data(data):
+    return yaml.dump(data, Dumper=Dumper, default_flow_style=False)
+
+
+def load_all_components(component_dir, repo_dir, commitish=None, cache=None,
+                        workers=None):
+    """Load every component in `component_dir`.
+
+    With a `commitish` the components are read from that commit's tree in
+    the object database, leaving the index and working tree untouched.
+    """
+    if not commitish:
+        return _load_components(
+            load_component_data,
+            [
+                (os.path.join(component_dir, cf), cache)
+                for cf in sorted(os.listdir(component_dir))
+            ],
+            component_dir,
+            workers,
+        )
 
-    if commitish:
-        repo.head.reference = repo.commit(commitish)
-        repo.head.reset(index=True, working_tree=True)
+    return _load_blob_components(
+        component_blobs(component_dir, repo_dir, commitish),
+        component_dir,
+        cache,
+        workers,
+    )
+
+
+def load_changed_components(component_dir, repo_dir, from_commitish,
+                            to_commitish, cache=None, workers=None):
+    """Load the components whose files differ between two commits.
+
+    Returns the changed components as they are at `from_commitish` and at
+    `to_commitish`. Files with the same blob at both are never parsed.
+    """
+    from_blobs = {
+        b.name: b
+        for b in component_blobs(component_dir, repo_dir, from_commitish)
+    }
+    to_blobs = {
+        b.name: b
+        for b in component_blobs(component_dir, repo_dir, to_commitish)
+    }
+    unchanged = {
+        name for name, blob in from_blobs.items()
+        if name in to_blobs and to_blobs[name].binsha == blob.binsha
+    }
+
+    return tuple(
+        _load_blob_components(
+            [
+                blob for name, blob in blobs.items()
+                if name not in unchanged
+            ],
+            component_dir,
+            cache,
+            workers,
+        )
+        for blobs in (from_blobs, to_blobs)
+    )
+
+
+def _load_components(loader, tasks, component_dir, workers=None):
+    """Create components from `loader(*task)` for each task, in order."""
+    return [
+        Component.from_data(d, component_dir)
+        for d in _map_loader(loader, tasks, workers)
+    ]
+
+
+def _load_blob_components(blobs, component_dir, cache=None, workers=None):
+    """Create components from git blobs, in order.
+
+    Blobs are immutable so with a `cache` the data is keyed on the blob SHA,
+    and only blobs missing from the cache are read, parsed and validated.
+    """
+    keys = ["component-blob:{sha}".format(sha=blob.hexsha) for blob in blobs]
+    component_data = [
+        cache.get(key) if cache is not None else None for key in keys
+    ]
+    missing = [i for i, data in enumerate(component_data) if data is None]
+    parsed = _map_loader(
+        _parse_component_blob,
+        [(blobs[i].data_stream.read(),) for i in missing],
+        workers,
+    )
+    for i, data in zip(missing, parsed):
+        if cache is not None:
+            cache.set(keys[i], data)
+        component_data[i] = data
 
-    components = []
-    for cf in os.listdir(component_dir):
-        name = cf[:-4]
-        components.append(Component.from_file(name, component_dir))
+    return [Component.from_data(d, component_dir) for d in component_data]
 
-    if commitish:
-        repo.head.reference = repo.commit(start_ref)
-        repo.head.reset(index=True, working_tree=True)
 
-    return components
+def _map_loader(loader, tasks, workers=None):
+    """Return `loader(*task)` for each task, in order.
+
+    With more than one worker, and enough tasks to outweigh starting a
+    process pool, parsing and validation are spread across processes.
+    """
+    if (
+        workers and workers > 1 and
+        len(tasks) >= PARALLEL_LOAD_THRESHOLD
+    ):
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(loader, *zip(*tasks), chunksize=chunksize))
+
+    return [loader(*task) for task in tasks]
+
+
+def component_blobs(component_dir, repo_dir, commitish):
+    """Return the blobs in `component_dir` at `commitish`."""
+    repo = git.Repo(repo_dir)
+    tree = repo.commit(commitish).tree
+    tree_path = os.path.relpath(
+        os.path.realpath(component_dir),
+        os.path.realpath(repo.working_tree_dir),
+    )
+    if tree_path != os.curdir:
+        try:
+            tree = tree / tree_path.replace(os.sep, "/")
+        except KeyError:
+            return []
+
+    return tree.blobs
 
 
 def load_requirements(directory):
@@ -318,6 +607,27 @@ def load_requirements(directory):
     return component_requirements_schema.validate(data)
 
 
+def load_metadata(directory):
+    filepath = os.path.join(directory, METADATA_FILENAME)
+
+    try:
+        data = load_data(filepath)
+    except FileNotFoundError:
+        data = {"artifacts": [], "dependencies": [], "jenkins": {}}
+    return component_metadata_schema.validate(data)
+
+
+def load_commit_metadata(repo, commitish):
+    """Load component metadata from a commit's tree, not the checkout."""
+    try:
+        blob = repo.commit(commitish).tree / METADATA_FILENAME
+    except KeyError:
+        data = {"artifacts": [], "dependencies": [], "jenkins": {}}
+    else:
+        data = parse_data(blob.data_stream.read())
+    return component_metadata_schema.validate(data)
+
+
 def save_requirements(requirements, directory):
     filepath = os.path.join(directory, REQUIREMENTS_FILENAME)
 
@@ -351,8 +661,12 @@ def set_dependency(existing, name, constraints=None):
     return component_metadata_schema.validate(dependencies)
 
 
-def build_constraint_checker(constraints):
-    op_map = {
+class VersionConstraint:
+    """A `version<op><version>` constraint, parsed once and interned."""
+
+    __slots__ = ("constraint", "operator", "key")
+
+    operators = {
         "==": eq,
         "!=": ne,
         ">=": ge,
@@ -360,48 +674,138 @@ def build_constraint_checker(constraints):
         ">": gt,
         "<": lt,
     }
+    _compiled = {}
 
-    def check_constraint(fn, constraint):
-        c_key = tuple(
+    def __init__(self, constraint):
+        constraint_match = re.match(version_constraint_regex, constraint)
+        if not constraint_match:
+            raise ComponentError(
+                "Invalid version constraint '{c}'.".format(c=constraint)
+            )
+        self.constraint = constraint
+        self.operator = self.operators[
+            constraint_match.group("comparison_operator")
+        ]
+        self.key = tuple(
             takewhile(
                 lambda x: x is not None,
-                constraint_key(constraint)
+                constraint_key(constraint_match.group("version")),
             )
         )
 
-        def inner(version):
-            return fn(
-                constraint_key(version)[:len(c_key)],
-                c_key
-            )
-        return inner
+    @classmethod
+    def compile(cls, constraint):
+        try:
+            compiled = cls._compiled[constraint]
+        except KeyError:
+            compiled = cls._compiled[constraint] = cls(constraint)
+        return compiled
 
-    checks = []
-    for constraint in constraints:
-        constraint_match = re.match(version_constraint_regex, constraint)
-        checks.append(
-            check_constraint(
-                op_map[constraint_match.group("comparison_operator")],
-                constraint_match.group("version"),
-            )
+    def __call__(self, version):
+        return self.operator(version.key[:len(self.key)], self.key)
+
+
+class VersionRange:
+    """The versions allowed by a set of version constraints.
+
+    Every constraint other than `!=` bounds the range from above, below or
+    both, so the newest matching release in a descending sequence is found
+    by bisection. Each `!=` constraint excludes a contiguous run of
+    releases which is skipped by bisection too.
+    """
+
+    __slots__ = ("constraints", "_upper", "_lower", "_excluded")
+
+    _upper_bounds = {lt: lt, le: le, eq: le}
+    _lower_bounds = {gt: gt, ge: ge, eq: ge}
+    _compiled = {}
+
+    def __init__(self, constraints):
+        self.constraints = tuple(
+            VersionConstraint.compile(c) for c in constraints
+        )
+        self._upper = tuple(
+            (self._upper_bounds[c.operator], c.key)
+            for c in self.constraints if c.operator in self._upper_bounds
+        )
+        self._lower = tuple(
+            (self._lower_bounds[c.operator], c.key)
+            for c in self.constraints if c.operator in self._lower_bounds
+        )
+        self._excluded = tuple(
+            c.key for c in self.constraints if c.operator is ne
         )
 
-    return lambda v: all(c(v) for c in checks)
+    @classmethod
+    def compile(cls, constraints):
+        constraints = tuple(constraints)
+        try:
+            compiled = cls._compiled[constraints]
+        except KeyError:
+            compiled = cls._compiled[constraints] = cls(constraints)
+        return compiled
+
+    def __call__(self, version):
+        if not isinstance(version, Version):
+            version = Version(version)
+        return all(c(version) for c in self.constraints)
+
+    def newest(self, releases):
+        """Return the first of `releases`, newest first, in the range."""
+        def within(bounds, release):
+            key = release.parsed_version.key
+            return all(fn(key[:len(b_key)], b_key) for fn, b_key in bounds)
+
+        i = _bisect(releases, partial(within, self._upper))
+        while i < len(releases):
+            release = releases[i]
+            if not within(self._lower, release):
+                break
+            key = release.parsed_version.key
+            for e_key in self._excluded:
+                if key[:len(e_key)] == e_key:
+                    i = _bisect(
+                        releases,
+                        partial(within, ((lt, e_key),)),
+                        i,
+                    )
+                    break
+            else:
+                return release
+
+        return None
+
+
+def _bisect(releases, predicate, lo=0):
+    """Return the first index from `lo` at which `predicate` holds.
+
+    `predicate` must not hold for any release before one for which it does.
+    """
+    hi = len(releases)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(releases[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def build_constraint_checker(constraints):
+    return VersionRange.compile(constraints)
 
 
 def requirement_from_version_constraints(component, constraints):
-    meets_constraints = build_constraint_checker(constraints)
-    for release in component.releases:
-        if meets_constraints(release.version):
-            requirement = {
-                "name": component.name,
-                "ref": release.version,
-                "ref_type": "tag",
-                "repo_url": component.repo_url,
-                "sha": release.sha,
-                "version": release.version,
-            }
-            break
+    release = VersionRange.compile(constraints).newest(component.releases)
+    if release is not None:
+        requirement = {
+            "name": component.name,
+            "ref": release.version,
+            "ref_type": "tag",
+            "repo_url": component.repo_url,
+            "sha": release.sha,
+            "version": release.version,
+        }
     else:
         raise Exception(
             (
@@ -413,17 +817,13 @@ def requirement_from_version_constraints(component, constraints):
     return requirement
 
 
-def requirement_from_branch_constraints(component, constraints):
+def requirement_from_branch_constraints(component, constraints, cache=None):
     constraint = constraints.pop()
     assert len(constraints) == 0
 
     constraint_match = re.match(branch_constraint_regex, constraint)
     branch_name = constraint_match.group("branch_name")
-    with TemporaryDirectory() as tmp_dir:
-        repo = git.Repo.clone_from(
-            component.repo_url, tmp_dir, branch=branch_name
-        )
-        sha = repo.head.commit.hexsha
+    sha = resolve_branch(component.repo_url, branch_name, cache)
 
     requirement = {
         "name": component.name,
@@ -437,10 +837,66 @@ def requirement_from_branch_constraints(component, constraints):
     return requirement
 
 
-def update_requirements(metadata, component_dir):
+def remote_refs(repo_url, *patterns):
+    """Return the SHA of each ref advertised by a remote matching patterns.
+
+    Only the ref listing is requested, no objects are transferred.
+    """
+    refs = {}
+    for line in git.cmd.Git().ls_remote(repo_url, *patterns).splitlines():
+        sha, ref = line.split("\t", 1)
+        refs[ref] = sha
+
+    return refs
+
+
+def remote_tags(repo_url):
+    """Return (name, commit sha) pairs for a remote's tags, sorted by name.
+
+    Annotated tags are peeled to the commit they point at.
+    """
+    tags = {}
+    for ref, sha in remote_refs(repo_url, "refs/tags/*").items():
+        name = ref[len("refs/tags/"):]
+        if name.endswith("^{}"):
+            tags[name[:-len("^{}")]] = sha
+        else:
+            tags.setdefault(name, sha)
+
+    return sorted(tags.items())
+
+
+def resolve_branch(repo_url, branch_name, cache=None):
+    """Return the SHA at the head of a remote branch.
+
+    With a `cache`, a SHA resolved within the cache's `max_age` is reused
+    rather than asking the remote again.
+    """
+    key = "branch:{url}:{branch}".format(url=repo_url, branch=branch_name)
+    sha = cache.get(key) if cache is not None else None
+    if sha is None:
+        ref = "refs/heads/{branch}".format(branch=branch_name)
+        try:
+            sha = remote_refs(repo_url, ref)[ref]
+        except KeyError:
+            raise ComponentError(
+                "Branch '{b}' does not exist in '{url}'.".format(
+                    b=branch_name, url=repo_url,
+                )
+            )
+        if cache is not None:
+            cache.set(key, sha)
+
+    return sha
+
+
+def update_requirements(metadata, component_dir, cache=None,
+                        branch_cache=None):
     requirements = {"dependencies": []}
     for dependency in metadata["dependencies"]:
-        component = Component.from_file(dependency["name"], component_dir)
+        component = Component.from_file(
+            dependency["name"], component_dir, cache
+        )
         constraints = dependency["constraints"]
         try:
             branch_constraints_schema.validate(constraints)
@@ -452,7 +908,8 @@ def update_requirements(metadata, component_dir):
         else:
             requirement = requirement_from_branch_constraints(
                 component,
-                constraints
+                constraints,
+                branch_cache,
             )
 
         requirements["dependencies"].append(requirement)
@@ -460,35 +917,257 @@ def update_requirements(metadata, component_dir):
     return component_requirements_schema.validate(requirements)
 
 
-def download_requirements(requirements, dl_base_dir):
-    for requirement in requirements:
-        repo_dir = os.path.join(dl_base_dir, requirement["name"])
-        try:
-            repo = git.Repo(repo_dir)
-        except git.exc.NoSuchPathError:
-            repo = git.Repo.clone_from(requirement["repo_url"], repo_dir)
-        else:
-            repo.remote("origin").fetch()
+def download_requirements(requirements, dl_base_dir, jobs=1, shallow=False,
+                          blobless=False):
+    """Check out each requirement's pinned commit under `dl_base_dir`.
+
+    With more than one job, requirements are downloaded concurrently and
+    any failures are reported together once every download has finished.
+    See `download_requirement` for `shallow` and `blobless`. Returns the
+    number of fetches avoided because the pinned commit was already present.
+    """
+    download = partial(
+        download_requirement,
+        dl_base_dir=dl_base_dir,
+        shallow=shallow,
+        blobless=blobless,
+    )
+    if jobs <= 1:
+        return sum(download(requirement) for requirement in requirements)
+
+    # Finish the lazy import of git first, it is not safe to do so from
+    # several threads at once.
+    git.Repo
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            (r["name"], pool.submit(download, r)) for r in requirements
+        ]
+    errors = [
+        "{name}: {e}".format(name=name, e=future.exception())
+        for name, future in futures if future.exception()
+    ]
+    if errors:
+        raise ComponentError(
+            "Failed to download requirements:\n{errors}".format(
+                errors="\n".join(errors)
+            )
+        )
+
+    return sum(future.result() for _, future in futures)
+
+
+def download_requirement(requirement, dl_base_dir, shallow=False,
+                         blobless=False):
+    """Check out a requirement's pinned commit under `dl_base_dir`.
+
+    By default the whole repository is cloned or fetched through its
+    mirror. With `shallow` only the pinned commit is fetched straight from
+    the remote, without history, and with `blobless` also without file
+    contents, which are then fetched on demand by the checkout. Nothing is
+    fetched when the pinned commit is already present, in which case True
+    is returned.
+    """
+    repo_dir = os.path.join(dl_base_dir, requirement["name"])
+    try:
+        repo = git.Repo(repo_dir)
+    except git.exc.NoSuchPathError:
+        repo = None
+    fetch_avoided = repo is not None and has_commit(repo, requirement["sha"])
+
+    if fetch_avoided:
+        pass
+    elif shallow:
+        repo = fetch_commit(
+            requirement["repo_url"], repo_dir, requirement["sha"], blobless
+        )
+    elif repo is None:
+        repo = clone_repo(
+            requirement["repo_url"], repo_dir, requirement["sha"]
+        )
+    else:
+        fetch_repo(repo, requirement["repo_url"], requirement["sha"])
+
+    repo.head.reference = repo.commit(requirement["sha"])
+    repo.head.reset(index=True, working_tree=True)
+
+    return fetch_avoided
+
+
+def update_mirror(repo_url, sha=None):
+    """Return the path of a local bare mirror of `repo_url`.
+
+    Mirrors are shared by every clone the tool makes and each is fetched
+    from its remote once per process, or again if it lacks commit `sha`.
+    """
+    mirror_dir = os.path.join(
+        os.path.expanduser(MIRROR_DIR),
+        hashlib.sha1(repo_url.encode("utf-8")).hexdigest(),
+    )
+    with _mirror_locks_lock:
+        lock = _mirror_locks.setdefault(mirror_dir, threading.Lock())
+
+    with lock:
+        if (
+            mirror_dir not in _updated_mirrors or
+            sha and not has_commit(git.Repo(mirror_dir), sha)
+        ):
+            mirror = git.Repo.init(mirror_dir, bare=True)
+            if "origin" not in (r.name for r in mirror.remotes):
+                mirror.create_remote("origin", repo_url)
+            mirror.git.fetch(
+                "origin",
+                "+refs/heads/*:refs/heads/*",
+                "+refs/tags/*:refs/tags/*",
+            )
+            _updated_mirrors.add(mirror_dir)
+
+    return mirror_dir
 
-        repo.head.reference = repo.commit(requirement["sha"])
-        repo.head.reset(index=True, working_tree=True)
 
+def clone_repo(repo_url, repo_dir, sha=None, **kwargs):
+    """Clone `repo_url` locally from its mirror, borrowing its objects.
 
-def download_components(components, dl_base_dir):
+    The clone's origin is set back to `repo_url`.
+    """
+    mirror_dir = update_mirror(repo_url, sha)
+    repo = git.Repo.clone_from(
+        mirror_dir, repo_dir, reference=mirror_dir, **kwargs
+    )
+    repo.remote("origin").set_url(repo_url)
+
+    return repo
+
+
+def fetch_repo(repo, repo_url, sha=None):
+    """Fetch origin's branches and tags into `repo` from its mirror."""
+    mirror_dir = update_mirror(repo_url, sha)
+    repo.git.fetch(
+        mirror_dir,
+        "+refs/heads/*:refs/remotes/origin/*",
+        "+refs/tags/*:refs/tags/*",
+    )
+
+
+def fetch_commit(repo_url, repo_dir, sha, blobless=False):
+    """Fetch the single commit `sha` into `repo_dir`, if it is missing.
+
+    The repository is created when needed. Only the commit and its tree
+    are transferred, and with `blobless` not even the file contents.
+    """
+    try:
+        repo = git.Repo(repo_dir)
+    except git.exc.NoSuchPathError:
+        repo = git.Repo.init(repo_dir)
+        repo.create_remote("origin", repo_url)
+
+    if not has_commit(repo, sha):
+        options = ["--depth=1"]
+        if blobless:
+            options.append("--filter=blob:none")
+        repo.git.fetch("origin", sha, *options)
+
+    return repo
+
+
+def has_commit(repo, sha):
+    try:
+        repo.git.cat_file("-e", "{sha}^{{commit}}".format(sha=sha))
+    except git.exc.GitCommandError:
+        return False
+    return True
+
+
+def load_dependents_index(path=DEPENDENTS_INDEX_PATH):
+    """Return the reverse dependency index saved at `path`.
+
+    The index maps each component name to its series, and each series to
+    the head sha it was indexed at and the names of its dependencies.
+    """
+    try:
+        with open(os.path.expanduser(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_dependents_index(index, path=DEPENDENTS_INDEX_PATH):
+    path = os.path.expanduser(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def update_dependents_index(index, components, missing_only=False):
+    """Bring `index` up to date with the series heads of `components`.
+
+    Series heads are listed from each component's remote and metadata is
+    only read for series whose head has moved since they were indexed. It
+    is read from the commit in the component's mirror, with no checkout.
+    With `missing_only`, components already in the index are left as they
+    are and their remotes are not contacted.
+    """
     for component in components:
-        repo_dir = os.path.join(dl_base_dir, component["name"])
-        try:
-            repo = git.Repo(repo_dir)
-        except git.exc.NoSuchPathError:
-            repo = git.Repo.clone_from(component["repo_url"], repo_dir)
-        else:
-            repo.remote("origin").fetch()
+        if missing_only and component.name in index:
+            continue
+        series_list = []
+        for release in component.releases:
+            if release.series not in series_list:
+                series_list.append(release.series)
+        if not series_list:
+            index.pop(component.name, None)
+            continue
+
+        heads = remote_refs(
+            component.repo_url,
+            *("refs/heads/{s}".format(s=s) for s in series_list)
+        )
+        indexed = index.get(component.name, {})
+        entry = {}
+        mirror = None
+        for series in series_list:
+            try:
+                sha = heads["refs/heads/{s}".format(s=series)]
+            except KeyError:
+                raise ComponentError(
+                    "Series '{s}' of component '{c}' has no branch in "
+                    "'{url}'.".format(
+                        s=series, c=component.name, url=component.repo_url,
+                    )
+                )
+            if indexed.get(series, {}).get("sha") == sha:
+                entry[series] = indexed[series]
+                continue
+
+            mirror_dir = update_mirror(component.repo_url, sha)
+            if mirror is None:
+                mirror = git.Repo(mirror_dir)
+            metadata = load_commit_metadata(mirror, sha)
+            entry[series] = {
+                "sha": sha,
+                "dependencies": [
+                    d["name"] for d in metadata.get("dependencies", [])
+                ],
+            }
+        index[component.name] = entry
+
+    names = {component.name for component in components}
+    for name in list(index):
+        if name not in names:
+            del index[name]
+
+    return index
+
 
-        if component["sha"]:
-            repo.head.reference = repo.commit(component["sha"])
-            repo.head.reset(index=True, working_tree=True)
-        elif component["series"]:
-            repo.git.checkout(component["series"])
+def find_dependents(index, components, name):
+    """Return `components` depending on `name`, once per dependent series."""
+    return [
+        component
+        for component in components
+        for series in index.get(component.name, {}).values()
+        if name in series["dependencies"]
+    ]
 
 
 def commit_changes(repo_dir, files, message):
@@ -1,14 +1,11 @@
-from collections import ChainMap
-from functools import partial
+from functools import partial, total_ordering
 import re
 
-from schema import And, Optional, Or, Regex, Schema
-
 
 def sorted_versions(versions):
     return sorted(
         versions,
-        key=lambda v: version_key(v["version"]),
+        key=lambda v: Version(v["version"]),
         reverse=True,
     )
 
@@ -40,42 +37,6 @@ version_regex = (
     r"(?P<prerelease_version>[0-9]+))?)$"
 )
 
-version_id_schema = Regex(version_regex)
-version_sha_schema = Regex(sha_regex)
-version_schema = Schema(
-    {
-        "version": version_id_schema,
-        "sha": version_sha_schema,
-    },
-)
-
-comparison_added_version_schema = Schema(
-    And(
-        {
-            And(str, len): {
-                "added": {
-                    "releases": And(
-                        [
-                            {
-                                Optional("series"): And(str, len),
-                                "versions": And(
-                                    [version_schema],
-                                    lambda vs: len(vs) == 1,
-                                ),
-                            }
-                        ],
-                        lambda rs: len(rs) == 1,
-                    )
-                },
-                "deleted": {},
-            }
-        },
-        lambda cs: len(cs) == 1,
-    )
-)
-
-repo_url_schema = Regex(r"^https://github.com/.+")
-
 comparison_operator_regex = r"(?P<comparison_operator>(=|!)=|(<|>)=?)"
 constraint_regex = (
     r"(?P<version>r?(?P<major>[0-9]+)"
@@ -89,188 +50,20 @@ version_constraint_regex = r"^version{op}{version}$".format(
     version=constraint_regex,
 )
 branch_constraint_regex = r"^branch==(?P<branch_name>.+)$"
-branch_constraints_schema = And(
-    [Regex(branch_constraint_regex)],
-    lambda cs: len(cs) == 1,
-)
-
-constraints_schema = Or(
-    [Regex(version_constraint_regex)],
-    branch_constraints_schema,
-)
-
-component_single_version_schema = Schema(
-    {
-        "name": And(str, len),
-        "repo_url": repo_url_schema,
-        "is_product": bool,
-        "release": {
-            "series": And(str, len),
-            "version": version_id_schema,
-            "sha": version_sha_schema,
-        },
-        Optional("artifact_stores", default=[]): And(
-            [
-                {
-                    "description": Or(str, None),
-                    "name": And(str, len),
-                    "public_url": And(str, len),
-                    "type": And(str, len),
-                },
-            ],
-            is_value_unique("name"),
-        ),
-    }
-)
-
-component_schema = Schema(
-    {
-        "name": And(str, len),
-        "repo_url": repo_url_schema,
-        "is_product": bool,
-        "releases": And(
-            [
-                {
-                    "series": And(str, len),
-                    "versions": And(
-                        [
-                            version_schema,
-                        ],
-                        is_sorted_versions,
-                    ),
-                },
-            ],
-            is_value_unique("series"),
-            is_version_ids_unique,
-        ),
-        Optional("artifact_stores", default=[]): And(
-            [
-                {
-                    "description": Or(str, None),
-                    "name": And(str, len),
-                    "public_url": And(str, len),
-                    "type": And(str, len),
-                },
-            ],
-            is_value_unique("name"),
-        ),
-    }
-)
-
-dependencies_schema = Schema(
-    {
-        Optional("dependencies"): And(
-            [
-                {
-                    "name": And(str, len),
-                    "constraints": constraints_schema,
-                },
-            ],
-            is_value_unique("name"),
-        )
-    }
-)
-
-artifacts_file_schema = Schema(
-    {
-        "type": "file",
-        "source": And(str, len),
-        Optional("dest"): And(str, len),
-        Optional("expire_after"): And(int, lambda n: n > 0)
-    }
-)
-
-artifacts_log_schema = Schema(
-    {
-        "type": "log",
-        "source": And(str, len)
-    }
-)
 
-artifacts_schema = Schema(
-    {
-        Optional("artifacts"):
-            [
-                Or(artifacts_file_schema, artifacts_log_schema)
-            ]
-    }
-)
 
-jenkins_schema = Schema(
-    {
-        Optional("jenkins"): {
-            Optional("jjb_paths"): [And(str, len)],
-        }
-    }
-)
-
-component_metadata_schema = Schema(
-    dict(
-        ChainMap(
-            *(s._schema for s in
-                (
-                    dependencies_schema,
-                    artifacts_schema,
-                    jenkins_schema,
-                )
-              )
-        )
+def __getattr__(name):
+    # Building the schemas imports the schema library, so it is left until
+    # one of them is first used.
+    if name.endswith("_schema"):
+        from rpc_component import _schemas
+        try:
+            return getattr(_schemas, name)
+        except AttributeError:
+            pass
+    raise AttributeError(
+        "module {m!r} has no attribute {n!r}".format(m=__name__, n=name)
     )
-)
-
-component_requirements_schema = Schema(
-    {
-        "dependencies": And(
-            [
-                {
-                    "name": And(str, len),
-                    "ref": Or(And(str, len), None),
-                    "ref_type": Or(lambda r: r in ("branch", "tag"), None),
-                    "repo_url": repo_url_schema,
-                    "sha": version_sha_schema,
-                    "version": Or(version_id_schema, None),
-                }
-            ],
-            is_value_unique("name"),
-        ),
-    }
-)
-
-comparison_added_component_schema = Schema(
-    And(
-        {
-            And(str, len): {
-                "added": And(component_schema),
-                "deleted": {},
-            }
-        },
-        lambda cs: len(cs) == 1,
-    )
-)
-
-comparison_added_artifact_stores_schema = Schema(
-    And(
-        {
-            And(str, len): {
-                "added": {
-                    "artifact_stores": And(
-                        [
-                            {
-                                "description": Or(str, None),
-                                "name": And(str, len),
-                                "public_url": And(str, len),
-                                "type": And(str, len),
-                            },
-                        ],
-                        is_value_unique("name"),
-                    ),
-                },
-                "deleted": {},
-            }
-        },
-        lambda s: len(s) == 1,
-    )
-)
 
 
 def _version_key(version_id, regex=None):
@@ -295,3 +88,36 @@ def _version_key(version_id, regex=None):
 
 version_key = partial(_version_key, regex=version_regex)
 constraint_key = partial(_version_key, regex=constraint_regex)
+
+
+@total_ordering
+class Version:
+    """A version identifier parsed once into its sort key.
+
+    Versions compare and hash on the key, so `r1.0.0` and `1.0.0` are equal.
+    """
+
+    __slots__ = ("version_id", "key")
+
+    def __init__(self, version_id):
+        self.version_id = version_id
+        self.key = version_key(version_id)
+
+    def __str__(self):
+        return self.version_id
+
+    def __repr__(self):
+        return "Version({v!r})".format(v=self.version_id)
+
+    def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key == other.key
+
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
@@ -0,0 +1,100 @@
+import os
+from tempfile import TemporaryDirectory
+import time
+import unittest
+from unittest.mock import patch
+
+import rpc_component.cache as cache_lib
+import rpc_component.component as c
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.cache = cache_lib.DiskCache(self.tmp_dir.name, max_entries=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", {"value": [1, None, True]})
+        self.assertEqual({"value": [1, None, True]}, self.cache.get("a"))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        past = time.time() - 60
+        os.utime(self.cache._path("a"), (past, past))
+        os.utime(self.cache._path("b"), (past - 60, past - 60))
+        self.cache.get("b")
+        self.cache.set("c", 3)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(2, self.cache.get("b"))
+        self.assertEqual(3, self.cache.get("c"))
+
+    def test_max_age(self):
+        self.cache.set("a", 1)
+        fresh = cache_lib.DiskCache(self.tmp_dir.name, max_age=60)
+        self.assertEqual(1, fresh.get("a"))
+        expired = cache_lib.DiskCache(self.tmp_dir.name, max_age=0)
+        self.assertIsNone(expired.get("a"))
+
+    def test_clear(self):
+        self.cache.set("a", 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("a"))
+
+
+class TestComponentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.component_dir = os.path.join(self.tmp_dir.name, "components")
+        os.makedirs(self.component_dir)
+        self.cache = cache_lib.DiskCache(
+            os.path.join(self.tmp_dir.name, "cache")
+        )
+        component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                }
+            ],
+            directory=self.component_dir,
+        )
+        component.to_file()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_unchanged_file_not_parsed(self):
+        first = c.Component.from_file("test1", self.component_dir, self.cache)
+        with patch("rpc_component.component.load_data") as load_data:
+            second = c.Component.from_file(
+                "test1", self.component_dir, self.cache
+            )
+        load_data.assert_not_called()
+        self.assertEqual(first.to_dict(), second.to_dict())
+        self.assertFalse(second._is_changed)
+
+    def test_changed_file_parsed(self):
+        component = c.Component.from_file(
+            "test1", self.component_dir, self.cache
+        )
+        component.create_release(
+            version="1.1.0",
+            sha="0000000000000000000000000000000000000001",
+            series="first",
+        )
+        component.to_file()
+        component = c.Component.from_file(
+            "test1", self.component_dir, self.cache
+        )
+        self.assertEqual(2, len(component.releases))
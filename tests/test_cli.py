@@ -0,0 +1,350 @@
+from contextlib import redirect_stderr
+import io
+import os
+from tempfile import TemporaryDirectory
+import time
+import unittest
+from unittest.mock import patch
+
+import git
+import schema
+
+import rpc_component.cli as cli
+import rpc_component.component as c
+
+
+class TestUpdateReleasesRepo(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        cache_patcher = patch.object(cli.cache_lib, "CACHE_DIR", cache_dir)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        self.repo_dir = os.path.join(cache_dir, "releases")
+        self.stamp_path = self.repo_dir + ".last_sync"
+
+        self.remote_url = os.path.join(self.tmp_dir.name, "releases.git")
+        git.Repo.init(self.remote_url, bare=True)
+        self.work = git.Repo.init(
+            os.path.join(self.tmp_dir.name, "releases.work")
+        )
+        self.work.create_remote("origin", self.remote_url)
+        self.push_commit()
+
+    def push_commit(self):
+        actor = git.Actor("test", "test@example.com")
+        commit = self.work.index.commit(
+            "commit", author=actor, committer=actor
+        )
+        self.work.git.push("origin", "HEAD:master")
+        return commit.hexsha
+
+    def head(self):
+        return git.Repo(self.repo_dir).head.commit.hexsha
+
+    def age_stamp(self, seconds):
+        past = time.time() - seconds
+        os.utime(self.stamp_path, (past, past))
+
+    def test_clone(self):
+        sha = self.push_commit()
+        self.assertEqual(
+            self.repo_dir, cli.update_releases_repo(self.remote_url)
+        )
+        self.assertEqual(sha, self.head())
+        self.assertTrue(os.path.exists(self.stamp_path))
+
+    def test_pull(self):
+        cli.update_releases_repo(self.remote_url)
+        sha = self.push_commit()
+        cli.update_releases_repo(self.remote_url)
+        self.assertEqual(sha, self.head())
+
+    def test_no_pull_within_interval(self):
+        cli.update_releases_repo(self.remote_url)
+        old_sha = self.head()
+        self.age_stamp(60)
+        self.push_commit()
+        cli.update_releases_repo(self.remote_url, sync_interval=3600)
+        self.assertEqual(old_sha, self.head())
+
+    def test_pull_outside_interval(self):
+        cli.update_releases_repo(self.remote_url)
+        self.age_stamp(7200)
+        sha = self.push_commit()
+        cli.update_releases_repo(self.remote_url, sync_interval=3600)
+        self.assertEqual(sha, self.head())
+        self.assertLess(
+            time.time() - os.stat(self.stamp_path).st_mtime, 60
+        )
+
+    def test_no_sync(self):
+        cli.update_releases_repo(self.remote_url)
+        old_sha = self.head()
+        self.age_stamp(7200)
+        self.push_commit()
+        path = os.path.join(self.repo_dir, "edited")
+        with open(path, "w") as f:
+            f.write("edited")
+        git.Repo(self.repo_dir).index.add(["edited"])
+
+        cli.update_releases_repo(self.remote_url, sync=False)
+        self.assertEqual(old_sha, self.head())
+        self.assertFalse(os.path.exists(path))
+
+    def test_no_sync_without_clone(self):
+        with self.assertRaises(c.ComponentError):
+            cli.update_releases_repo(self.remote_url, sync=False)
+        self.assertFalse(os.path.exists(self.repo_dir))
+
+    def test_verbose(self):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            cli.update_releases_repo(self.remote_url, verbose=True)
+        last_sync = os.stat(self.stamp_path).st_mtime
+        self.assertEqual(
+            "Releases repo last synced: {t}\n".format(t=time.ctime(last_sync)),
+            stderr.getvalue(),
+        )
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.releases_dir = self.tmp_dir.name
+        self.components_dir = os.path.join(self.releases_dir, "components")
+        self.repo = git.Repo.init(self.releases_dir)
+        with self.repo.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+        os.makedirs(self.components_dir)
+        for name in ("foo", "baz"):
+            c.Component(
+                name=name,
+                repo_url="https://github.com/rcbops/{n}".format(n=name),
+                is_product=False,
+                directory=self.components_dir,
+            ).to_file()
+        self.repo.git.add(self.components_dir)
+        self.repo.git.commit(message="Initial commit")
+        self.initial_head = self.repo.head.commit.hexsha
+
+    def batch(self, operations, commit_changes=True):
+        return cli.batch(
+            self.releases_dir,
+            self.components_dir,
+            commit_changes=commit_changes,
+            file=io.StringIO(c.dump_data(operations)),
+        )
+
+    def load(self, name):
+        return c.Component.from_file(name, self.components_dir)
+
+    def assertUntouched(self):
+        self.assertEqual(self.initial_head, self.repo.head.commit.hexsha)
+        self.assertEqual("", self.repo.git.status("--porcelain"))
+
+    def release_add(self, name, version, series="master"):
+        return {
+            "operation": "release-add",
+            "component_name": name,
+            "version": version,
+            "sha": "0" * 40,
+            "series_name": series,
+        }
+
+    def test_single_commit(self):
+        operations = [
+            self.release_add("foo", "1.0.0"),
+            self.release_add("foo", "1.1.0"),
+            self.release_add("baz", "2.0.0"),
+            {
+                "operation": "artifact-store-add",
+                "component_name": "foo",
+                "name": "store",
+                "type": "file",
+                "public_url": "https://example.com/",
+            },
+        ]
+        with patch.object(c, "save_data", wraps=c.save_data) as save_data:
+            results = self.batch(operations)
+
+        self.assertEqual(2, save_data.call_count)
+        self.assertEqual(4, len(results))
+        commits = list(self.repo.iter_commits())
+        self.assertEqual(2, len(commits))
+        self.assertEqual(
+            "Apply 4 component operations\n\n"
+            "Add component foo release 1.0.0\n"
+            "Add component foo release 1.1.0\n"
+            "Add component baz release 2.0.0\n"
+            "Add component foo artifact store store",
+            commits[0].message.strip(),
+        )
+        self.assertEqual("", self.repo.git.status("--porcelain"))
+        foo = self.load("foo")
+        self.assertEqual(
+            ["1.1.0", "1.0.0"], [r.version for r in foo.releases]
+        )
+        self.assertEqual("store", foo.artifact_stores[0]["name"])
+        self.assertEqual(1, len(self.load("baz").releases))
+
+    def test_single_operation_message(self):
+        self.batch([self.release_add("foo", "1.0.0")])
+        self.assertEqual(
+            "Add component foo release 1.0.0",
+            self.repo.head.commit.message.strip(),
+        )
+
+    def test_no_commit_changes(self):
+        self.batch([self.release_add("foo", "1.0.0")], commit_changes=False)
+        self.assertEqual(self.initial_head, self.repo.head.commit.hexsha)
+        self.assertEqual(1, len(self.load("foo").releases))
+
+    def test_results_are_snapshots(self):
+        results = self.batch(
+            [
+                self.release_add("foo", "1.0.0"),
+                {
+                    "operation": "update",
+                    "component_name": "foo",
+                    "new_name": "bar",
+                },
+                {
+                    "operation": "artifact-store-add",
+                    "component_name": "bar",
+                    "name": "store",
+                    "type": "file",
+                    "public_url": "https://example.com/",
+                },
+            ]
+        )
+        self.assertEqual("foo", results[0]["name"])
+        self.assertEqual([], results[0]["artifact_stores"])
+        self.assertEqual("bar", results[1]["name"])
+        self.assertEqual([], results[1]["artifact_stores"])
+
+    def test_rename(self):
+        self.batch(
+            [
+                {
+                    "operation": "update",
+                    "component_name": "foo",
+                    "new_name": "bar",
+                },
+                self.release_add("bar", "1.0.0"),
+            ]
+        )
+        self.assertEqual("", self.repo.git.status("--porcelain"))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.components_dir, "foo.yml"))
+        )
+        self.assertEqual(1, len(self.load("bar").releases))
+        self.assertNotIn("foo.yml", self.repo.git.ls_files())
+
+    def test_renamed_component_not_found(self):
+        with self.assertRaises(c.ComponentError):
+            self.batch(
+                [
+                    {
+                        "operation": "update",
+                        "component_name": "foo",
+                        "new_name": "bar",
+                    },
+                    self.release_add("foo", "1.0.0"),
+                ]
+            )
+        self.assertUntouched()
+
+    def test_rename_onto_existing(self):
+        with self.assertRaises(c.ComponentError):
+            self.batch(
+                [
+                    {
+                        "operation": "update",
+                        "component_name": "foo",
+                        "new_name": "baz",
+                    },
+                ]
+            )
+        self.assertUntouched()
+
+    def test_reuse_renamed_name(self):
+        operations = [
+            {
+                "operation": "update",
+                "component_name": "foo",
+                "new_name": "bar",
+            },
+            {
+                "operation": "add",
+                "component_name": "foo",
+                "repo_url": "https://github.com/rcbops/foo",
+            },
+        ]
+        with patch.object(c, "remote_tags", return_value=[]):
+            with self.assertRaises(c.ComponentError):
+                self.batch(operations)
+            with self.assertRaises(c.ComponentError):
+                self.batch(
+                    operations[:1] + [
+                        {
+                            "operation": "update",
+                            "component_name": "baz",
+                            "new_name": "foo",
+                        },
+                    ]
+                )
+        self.assertUntouched()
+
+    def test_add(self):
+        with patch.object(
+            c, "remote_tags", return_value=[("1.0.0", "1" * 40)]
+        ):
+            results = self.batch(
+                [
+                    {
+                        "operation": "add",
+                        "component_name": "new",
+                        "repo_url": "https://github.com/rcbops/new",
+                        "import_releases": ["master:.+"],
+                    },
+                    self.release_add("new", "1.1.0"),
+                ]
+            )
+        self.assertEqual(1, len(results[0]["releases"][0]["versions"]))
+        self.assertEqual(
+            ["1.1.0", "1.0.0"], [r.version for r in self.load("new").releases]
+        )
+        self.assertEqual("", self.repo.git.status("--porcelain"))
+
+    def test_failing_operation_leaves_repo_untouched(self):
+        with self.assertRaises(c.ComponentError):
+            self.batch(
+                [
+                    self.release_add("foo", "1.0.0"),
+                    self.release_add("baz", "1.0.0"),
+                    self.release_add("missing", "1.0.0"),
+                ]
+            )
+        self.assertUntouched()
+        self.assertEqual(0, len(self.load("foo").releases))
+
+    def test_invalid_component_leaves_repo_untouched(self):
+        with self.assertRaises(schema.SchemaError):
+            self.batch(
+                [
+                    self.release_add("foo", "1.0.0"),
+                    {
+                        "operation": "artifact-store-add",
+                        "component_name": "baz",
+                        "name": "store",
+                        "type": "file",
+                    },
+                ]
+            )
+        self.assertUntouched()
@@ -1,8 +1,12 @@
+import os
+from tempfile import TemporaryDirectory
 import unittest
 from unittest.mock import PropertyMock, patch
 
+import git
 import yaml
 
+import rpc_component.cache as cache_lib
 import rpc_component.component as c
 import rpc_component.schemata as schemata
 
@@ -94,8 +98,38 @@ class TestUpdateRequirements(unittest.TestCase):
                 "constraints": ["version<2.0.0-rc.2"],
                 "expected_version": "2.0.0-rc.1"
             },
+            {"constraints": ["version==1"], "expected_version": "1.1.1"},
+            {
+                "constraints": ["version<2", "version>=1", "version!=1.1"],
+                "expected_version": "1.0.1"
+            },
+            {
+                "constraints": ["version<2", "version!=1", "version!=0.0.1"],
+                "expected_version": None
+            },
+            {
+                "constraints": ["version!=10", "version!=2.0.0"],
+                "expected_version": "2.0.0-rc.2"
+            },
         )
         for test_case in constraints_test_cases:
+            meets_constraints = c.build_constraint_checker(
+                test_case["constraints"]
+            )
+            matching = [
+                r.version for r in component.releases
+                if meets_constraints(r.version)
+            ]
+            self.assertEqual(
+                test_case["expected_version"],
+                matching[0] if matching else None,
+            )
+            if test_case["expected_version"] is None:
+                with self.assertRaises(Exception):
+                    c.requirement_from_version_constraints(
+                        component, test_case["constraints"]
+                    )
+                continue
             calculated_requirement = c.requirement_from_version_constraints(
                 component, test_case["constraints"]
             )
@@ -104,6 +138,78 @@ class TestUpdateRequirements(unittest.TestCase):
                 calculated_requirement["version"]
             )
 
+    def test_compiled_constraints_interned(self):
+        self.assertIs(
+            c.VersionRange.compile(["version<2", "version!=1.1"]),
+            c.VersionRange.compile(("version<2", "version!=1.1")),
+        )
+        self.assertIs(
+            c.VersionConstraint.compile("version<2"),
+            c.VersionConstraint.compile("version<2"),
+        )
+
+
+class TestData(unittest.TestCase):
+
+    def setUp(self):
+        self.component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                }
+            ],
+            artifact_stores=[
+                {
+                    "name": "store",
+                    "type": "file",
+                    "public_url": "https://example.com/",
+                    "description": "A 'quoted' description: " + "x " * 50,
+                },
+            ],
+        )
+
+    def test_dump_data_matches_yaml_dump(self):
+        data = self.component.to_dict()
+        self.assertEqual(
+            yaml.dump(data, default_flow_style=False),
+            c.dump_data(data),
+        )
+
+    def test_dump_data_matches_yaml_dump_escaped(self):
+        descriptions = [
+            "Artefacts publiés pour le produit, voir la documentation pour "
+            "les détails de rétention et de publication",
+            "Tab\tseparated and bell\a escaped " + "text " * 20,
+        ]
+        for description in descriptions:
+            self.component.artifact_stores[0]["description"] = description
+            data = self.component.to_dict()
+            self.assertEqual(
+                yaml.dump(data, default_flow_style=False),
+                c.dump_data(data),
+            )
+
+    def test_dump_data_objects(self):
+        self.assertEqual(
+            yaml.dump(self.component, default_flow_style=False),
+            c.dump_data(self.component),
+        )
+        release = self.component.releases[0]
+        self.assertEqual(
+            yaml.dump(release, default_flow_style=False),
+            c.dump_data(release),
+        )
+
+    def test_dump_data_no_aliases(self):
+        self.assertNotIn(
+            "&id", c.dump_data([self.component, self.component])
+        )
+
 
 class TestRelease(unittest.TestCase):
 
@@ -161,6 +267,17 @@ class TestRelease(unittest.TestCase):
 
         self.assertEqual(expected, release.to_dict())
 
+    @patch.object(c.Component, "to_dict")
+    def test_dict_without_component_dict(self, component_to_dict):
+        release = c.Release(
+            self.component,
+            "1.0.0",
+            "0000000000000000000000000000000000000000",
+            "first",
+        )
+        self.assertEqual("1.0.0", release.to_dict()["release"]["version"])
+        component_to_dict.assert_not_called()
+
     def test_yaml(self):
         release = c.Release(
             self.component,
@@ -225,6 +342,45 @@ class TestComponent(unittest.TestCase):
         self.assertIsInstance(release, c.Release)
         self.assertEqual(release, component.get_release(release.version))
 
+    def test_releases_ordered(self):
+        component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+        )
+        versions = ("1.1.10", "1.0.0", "2.0.0-rc.1", "2.0.0", "1.1.2")
+        for i, version in enumerate(versions):
+            component.create_release(
+                version=version,
+                sha="{:040d}".format(i),
+                series="first",
+            )
+        self.assertEqual(
+            ["2.0.0", "2.0.0-rc.1", "1.1.10", "1.1.2", "1.0.0"],
+            [r.version for r in component.releases],
+        )
+
+    def test_add_duplicate_release(self):
+        component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                }
+            ],
+        )
+        with self.assertRaises(c.ComponentError):
+            component.create_release(
+                version="1.0.0",
+                sha="0000000000000000000000000000000000000001",
+                series="first",
+            )
+        self.assertEqual(1, len(component.releases))
+
     def test_get_release(self):
         component = c.Component(
             name="test1",
@@ -251,6 +407,52 @@ class TestComponent(unittest.TestCase):
         self.assertIsInstance(release_pred, c.Release)
         self.assertEqual("1.0.0", release_pred.version)
 
+        release_succ = component.get_release("1.0.0", successor=True)
+        self.assertIsInstance(release_succ, c.Release)
+        self.assertEqual("1.1.0", release_succ.version)
+
+        with self.assertRaises(c.ComponentError):
+            component.get_release("1.0.0", predecessor=True)
+        with self.assertRaises(c.ComponentError):
+            component.get_release("1.1.0", successor=True)
+        with self.assertRaises(c.ComponentError):
+            component.get_release("2.0.0")
+        with self.assertRaises(c.ComponentError):
+            component.get_release("1.0.0", predecessor=True, successor=True)
+
+    def test_get_release_after_out_of_order_add(self):
+        component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "2.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                },
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000001",
+                    "series": "first",
+                },
+            ],
+        )
+        self.assertEqual("1.0.0", component.get_release("1.0.0").version)
+        component.create_release(
+            version="1.5.0",
+            sha="0000000000000000000000000000000000000002",
+            series="first",
+        )
+        self.assertEqual(
+            "1.0.0",
+            component.get_release("1.5.0", predecessor=True).version,
+        )
+        self.assertEqual(
+            "2.0.0",
+            component.get_release("1.5.0", successor=True).version,
+        )
+
     def test_difference(self):
         component_pred = c.Component(
             name="test1",
@@ -306,6 +508,105 @@ class TestComponent(unittest.TestCase):
             component_pred.difference(component_succ)
         )
 
+    def test_difference_all_fields(self):
+        store = {
+            "name": "store1",
+            "type": "file",
+            "public_url": "https://example.com/1",
+            "description": None,
+        }
+        component_a = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=True,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                },
+                {
+                    "version": "1.1.0",
+                    "sha": "0000000000000000000000000000000000000001",
+                    "series": "first",
+                },
+                {
+                    "version": "2.0.0",
+                    "sha": "0000000000000000000000000000000000000002",
+                    "series": "second",
+                },
+            ],
+            artifact_stores=[store, dict(store, name="store2")],
+        )
+        component_b = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                },
+                {
+                    "version": "1.1.0",
+                    "sha": "000000000000000000000000000000000000000f",
+                    "series": "first",
+                },
+            ],
+            artifact_stores=[
+                store,
+                dict(store, name="store2", public_url="https://example.com"),
+            ],
+        )
+
+        expected_diff_a_b = {
+            "is_product": True,
+            "releases": [
+                {
+                    "series": "second",
+                    "versions": [
+                        {
+                            "version": "2.0.0",
+                            "sha": "0000000000000000000000000000000000000002",
+                        },
+                    ],
+                },
+                {
+                    "versions": [
+                        {
+                            "version": "1.1.0",
+                            "sha": "0000000000000000000000000000000000000001",
+                        },
+                    ],
+                },
+            ],
+            "artifact_stores": [dict(store, name="store2")],
+        }
+        self.assertEqual(
+            expected_diff_a_b, component_a.difference(component_b)
+        )
+
+        expected_diff_b_a = {
+            "is_product": False,
+            "releases": [
+                {
+                    "versions": [
+                        {
+                            "version": "1.1.0",
+                            "sha": "000000000000000000000000000000000000000f",
+                        },
+                    ],
+                },
+            ],
+            "artifact_stores": [
+                dict(store, name="store2", public_url="https://example.com"),
+            ],
+        }
+        self.assertEqual(
+            expected_diff_b_a, component_b.difference(component_a)
+        )
+
     def test_is_changed_when_new(self):
         component = c.Component(
             name="test1",
@@ -355,6 +656,89 @@ class TestComponent(unittest.TestCase):
         )
         self.assertTrue(component._is_changed)
 
+    @patch("rpc_component.component.save_data")
+    @patch("rpc_component.component.load_data")
+    def test_is_changed_rename_from_file(self, load_data, save_data):
+        load_data.return_value = {
+            "is_product": False,
+            "name": "test1",
+            "releases": [],
+            "repo_url": "https://github.com/rcbops/test1",
+        }
+        component = c.Component.from_file("test1", "components")
+        component.name = "test1"
+        component.repo_url = "https://github.com/rcbops/test1"
+        self.assertFalse(component._is_changed)
+        component.to_file()
+        save_data.assert_not_called()
+
+        component.name = "test2"
+        self.assertTrue(component._is_changed)
+        component.to_file()
+        save_data.assert_called_once_with(
+            "components/test2.yml",
+            component.to_dict(),
+            "components/test1.yml",
+        )
+
+    @patch("rpc_component.component.load_data")
+    def test_is_changed_artifact_store_from_file(self, load_data):
+        load_data.return_value = {
+            "is_product": False,
+            "name": "test1",
+            "releases": [],
+            "repo_url": "https://github.com/rcbops/test1",
+        }
+        component = c.Component.from_file("test1", ".")
+        self.assertFalse(component._is_changed)
+        component.add_artifact_store(
+            "store", "file", "https://example.com", None
+        )
+        self.assertTrue(component._is_changed)
+
+    @patch("rpc_component.component.save_data")
+    @patch("rpc_component.component.load_data")
+    def test_is_changed_artifact_store_edited_in_place(
+            self, load_data, save_data):
+        store = {
+            "name": "store",
+            "type": "file",
+            "public_url": "https://example.com",
+            "description": None,
+        }
+        load_data.return_value = {
+            "is_product": False,
+            "name": "test1",
+            "releases": [],
+            "repo_url": "https://github.com/rcbops/test1",
+            "artifact_stores": [store],
+        }
+        component = c.Component.from_file("test1", "components")
+        component_dict = component.to_dict()
+        self.assertFalse(component._is_changed)
+
+        component.get_artifact_store("store")["public_url"] = (
+            "https://example.org"
+        )
+        self.assertTrue(component._is_changed)
+        self.assertEqual(
+            "https://example.org",
+            component.to_dict()["artifact_stores"][0]["public_url"],
+        )
+        component.to_file()
+        save_data.assert_called_once_with(
+            "components/test1.yml", component.to_dict(), None
+        )
+
+        load_data.return_value["artifact_stores"] = [dict(store)]
+        component = c.Component.from_file("test1", "components")
+        self.assertEqual(component_dict, component.to_dict())
+        component.artifact_stores.append(dict(store, name="store2"))
+        self.assertTrue(component._is_changed)
+        self.assertEqual(2, len(component.to_dict()["artifact_stores"]))
+        component.to_file()
+        self.assertEqual(2, save_data.call_count)
+
     def test_dict(self):
         component = c.Component(
             name="test1",
@@ -389,6 +773,36 @@ class TestComponent(unittest.TestCase):
 
         self.assertEqual(expected, component.to_dict())
 
+    def test_dict_cached_until_changed(self):
+        component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+        )
+        component_dict = component.to_dict()
+        self.assertIs(component_dict, component.to_dict())
+
+        component.name = "test1"
+        self.assertIs(component_dict, component.to_dict())
+
+        component.name = "test2"
+        component_dict = component.to_dict()
+        self.assertEqual("test2", component_dict["name"])
+
+        component.create_release(
+            version="1.0.0",
+            sha="0000000000000000000000000000000000000000",
+            series="first",
+        )
+        self.assertIsNot(component_dict, component.to_dict())
+        component_dict = component.to_dict()
+        self.assertEqual(1, len(component_dict["releases"]))
+
+        component.add_artifact_store(
+            "store", "file", "https://example.com", None
+        )
+        self.assertEqual(1, len(component.to_dict()["artifact_stores"]))
+
     def test_yaml(self):
         component = c.Component(
             name="test1",
@@ -478,3 +892,539 @@ class TestComponent(unittest.TestCase):
         is_changed.return_value = True
         component.to_file()
         self.assertEqual(1, save_data.call_count)
+
+
+class TestLoadAllComponents(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.repo_dir = self.tmp_dir.name
+        self.component_dir = os.path.join(self.repo_dir, "components")
+        os.makedirs(self.component_dir)
+        self.repo = git.Repo.init(self.repo_dir)
+        self.actor = git.Actor("test", "test@example.com")
+
+        self.component = c.Component(
+            name="test1",
+            repo_url="https://github.com/rcbops/test1",
+            is_product=False,
+            releases=[
+                {
+                    "version": "1.0.0",
+                    "sha": "0000000000000000000000000000000000000000",
+                    "series": "first",
+                }
+            ],
+            directory=self.component_dir,
+        )
+        self.commit_component()
+        self.component.create_release(
+            version="1.1.0",
+            sha="0000000000000000000000000000000000000001",
+            series="first",
+        )
+        self.commit_component()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def commit_component(self):
+        self.component.to_file()
+        self.repo.index.add([os.path.join("components", "test1.yml")])
+        self.repo.index.commit(
+            "Update test1", author=self.actor, committer=self.actor
+        )
+
+    def test_load_from_working_tree(self):
+        components = c.load_all_components(self.component_dir, self.repo_dir)
+        self.assertEqual(["test1"], [c.name for c in components])
+        self.assertEqual(2, len(components[0].releases))
+
+    def test_load_from_commitish_leaves_checkout(self):
+        filepath = os.path.join(self.component_dir, "test1.yml")
+        with open(filepath, "a") as f:
+            f.write("# Local edit\n")
+        head = self.repo.head.commit
+
+        components = c.load_all_components(
+            self.component_dir, self.repo_dir, "HEAD~1"
+        )
+
+        self.assertEqual(["test1"], [c.name for c in components])
+        self.assertEqual(1, len(components[0].releases))
+        self.assertFalse(components[0]._is_changed)
+        self.assertEqual(head, self.repo.head.commit)
+        with open(filepath) as f:
+            self.assertTrue(f.read().endswith("# Local edit\n"))
+
+    def test_load_from_commitish_cached(self):
+        cache = cache_lib.DiskCache(os.path.join(self.tmp_dir.name, "cache"))
+        components = c.load_all_components(
+            self.component_dir, self.repo_dir, "HEAD", cache
+        )
+        with patch.object(
+            git.Blob, "data_stream", new_callable=PropertyMock
+        ) as data_stream:
+            cached = c.load_all_components(
+                self.component_dir, self.repo_dir, "HEAD", cache
+            )
+        data_stream.assert_not_called()
+        self.assertEqual(
+            [x.to_dict() for x in components], [x.to_dict() for x in cached]
+        )
+
+    @patch("rpc_component.component.parse_data", wraps=c.parse_data)
+    def test_load_changed_components(self, parse_data):
+        other = c.Component(
+            name="test2",
+            repo_url="https://github.com/rcbops/test2",
+            is_product=False,
+            directory=self.component_dir,
+        )
+        other.to_file()
+        self.repo.index.add([os.path.join("components", "test2.yml")])
+        self.repo.index.commit(
+            "Add test2", author=self.actor, committer=self.actor
+        )
+        self.component.create_release(
+            version="1.2.0",
+            sha="0000000000000000000000000000000000000002",
+            series="first",
+        )
+        self.commit_component()
+
+        from_, to = c.load_changed_components(
+            self.component_dir, self.repo_dir, "HEAD~1", "HEAD"
+        )
+
+        self.assertEqual(["test1"], [c.name for c in from_])
+        self.assertEqual(["test1"], [c.name for c in to])
+        self.assertEqual(2, len(from_[0].releases))
+        self.assertEqual(3, len(to[0].releases))
+        self.assertEqual(2, parse_data.call_count)
+
+        from_, to = c.load_changed_components(
+            self.component_dir, self.repo_dir, "HEAD~2", "HEAD~1"
+        )
+        self.assertEqual([], from_)
+        self.assertEqual(["test2"], [c.name for c in to])
+
+    def test_load_parallel(self):
+        for i in range(2, 6):
+            c.Component(
+                name="test{i}".format(i=i),
+                repo_url="https://github.com/rcbops/test{i}".format(i=i),
+                is_product=False,
+                directory=self.component_dir,
+            ).to_file()
+        serial = c.load_all_components(self.component_dir, self.repo_dir)
+
+        with patch.object(c, "PARALLEL_LOAD_THRESHOLD", 2), \
+                patch.object(
+                    c, "ProcessPoolExecutor", wraps=c.ProcessPoolExecutor
+                ) as pool:
+            parallel = c.load_all_components(
+                self.component_dir, self.repo_dir, workers=2
+            )
+
+        pool.assert_called_once_with(max_workers=2)
+        self.assertEqual(
+            ["test1", "test2", "test3", "test4", "test5"],
+            [c.name for c in parallel],
+        )
+        self.assertEqual(
+            [c.to_dict() for c in serial],
+            [c.to_dict() for c in parallel],
+        )
+
+
+def create_remote(path, branches=("master",), commits=1, files=None):
+    """Create a bare repository at `path` to use as a remote.
+
+    Each commit also writes `files`, a mapping of file name to content.
+    Returns the SHAs committed to each branch, oldest first.
+    """
+    work_dir = "{path}.work".format(path=path)
+    repo = git.Repo.init(work_dir)
+    actor = git.Actor("test", "test@example.com")
+    shas = {}
+    for i, branch in enumerate(branches):
+        if i:
+            repo.git.checkout("-b", branch)
+        shas[branch] = []
+        for n in range(commits):
+            with open(os.path.join(work_dir, "file"), "w") as f:
+                f.write("{branch} {n}".format(branch=branch, n=n))
+            for name, content in (files or {}).items():
+                with open(os.path.join(work_dir, name), "w") as f:
+                    f.write(content)
+            repo.index.add(["file"] + list(files or {}))
+            commit = repo.index.commit(
+                "{branch} {n}".format(branch=branch, n=n),
+                author=actor,
+                committer=actor,
+            )
+            shas[branch].append(commit.hexsha)
+    git.Repo.clone_from(work_dir, path, bare=True)
+
+    return shas
+
+
+class TestBranchConstraints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.remote_dir = os.path.join(self.tmp_dir.name, "remote.git")
+        self.shas = {
+            branch: shas[-1]
+            for branch, shas in create_remote(
+                self.remote_dir, ("master", "stable")
+            ).items()
+        }
+        self.component = c.Component(
+            name="test1",
+            repo_url=self.remote_dir,
+            is_product=False,
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch.object(git.Repo, "clone_from")
+    def test_requirement_from_branch_constraints(self, clone_from):
+        requirement = c.requirement_from_branch_constraints(
+            self.component, ["branch==stable"]
+        )
+        clone_from.assert_not_called()
+        self.assertEqual(
+            {
+                "name": "test1",
+                "ref": "stable",
+                "ref_type": "branch",
+                "repo_url": self.remote_dir,
+                "sha": self.shas["stable"],
+                "version": None,
+            },
+            requirement,
+        )
+
+    def test_resolve_branch_cached(self):
+        cache = cache_lib.DiskCache(
+            os.path.join(self.tmp_dir.name, "cache"), max_age=60
+        )
+        self.assertEqual(
+            self.shas["stable"],
+            c.resolve_branch(self.remote_dir, "stable", cache),
+        )
+        with patch("rpc_component.component.remote_refs") as remote_refs:
+            self.assertEqual(
+                self.shas["stable"],
+                c.resolve_branch(self.remote_dir, "stable", cache),
+            )
+        remote_refs.assert_not_called()
+
+        cache.max_age = 0
+        with patch("rpc_component.component.remote_refs") as remote_refs:
+            remote_refs.return_value = {
+                "refs/heads/stable": "0000000000000000000000000000000000000000"
+            }
+            self.assertEqual(
+                "0000000000000000000000000000000000000000",
+                c.resolve_branch(self.remote_dir, "stable", cache),
+            )
+        remote_refs.assert_called_once()
+
+    def test_remote_tags(self):
+        work_repo = git.Repo("{path}.work".format(path=self.remote_dir))
+        actor = git.Actor("test", "test@example.com")
+        work_repo.create_tag("1.0.0", ref=self.shas["master"])
+        with patch.dict(
+            os.environ,
+            {
+                "GIT_COMMITTER_NAME": actor.name,
+                "GIT_COMMITTER_EMAIL": actor.email,
+            },
+        ):
+            work_repo.create_tag(
+                "2.0.0", ref=self.shas["stable"], message="Release 2.0.0"
+            )
+        work_repo.git.push(self.remote_dir, "--tags")
+
+        self.assertEqual(
+            [("1.0.0", self.shas["master"]), ("2.0.0", self.shas["stable"])],
+            c.remote_tags(self.remote_dir),
+        )
+
+    def test_missing_branch(self):
+        with self.assertRaises(c.ComponentError):
+            c.requirement_from_branch_constraints(
+                self.component, ["branch==missing"]
+            )
+
+
+class TestDownloadRequirements(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.dl_dir = os.path.join(self.tmp_dir.name, "download")
+        self.mirror_dir = os.path.join(self.tmp_dir.name, "mirrors")
+        mirror_patcher = patch.object(c, "MIRROR_DIR", self.mirror_dir)
+        mirror_patcher.start()
+        self.addCleanup(mirror_patcher.stop)
+        self.requirements = []
+        for name in ("test1", "test2", "test3"):
+            remote_dir = os.path.join(self.tmp_dir.name, name + ".git")
+            shas = create_remote(remote_dir, commits=2)["master"]
+            self.requirements.append(
+                {
+                    "name": name,
+                    "ref": shas[0],
+                    "ref_type": None,
+                    "repo_url": remote_dir,
+                    "sha": shas[0],
+                    "version": None,
+                }
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertDownloaded(self, requirements, dl_dir=None):
+        for requirement in requirements:
+            repo = git.Repo(
+                os.path.join(dl_dir or self.dl_dir, requirement["name"])
+            )
+            self.assertEqual(requirement["sha"], repo.head.commit.hexsha)
+            self.assertFalse(repo.is_dirty())
+
+    def test_download_requirements(self):
+        c.download_requirements(self.requirements, self.dl_dir)
+        self.assertDownloaded(self.requirements)
+
+    def test_download_requirements_skips_fetch(self):
+        self.assertEqual(
+            0, c.download_requirements(self.requirements, self.dl_dir)
+        )
+        self.requirements[1]["sha"] = self.requirements[1]["ref"] = (
+            git.Repo(self.requirements[1]["repo_url"]).head.commit.hexsha
+        )
+        with patch.object(c, "fetch_repo") as fetch_repo, \
+                patch.object(c, "clone_repo") as clone_repo:
+            self.assertEqual(
+                3,
+                c.download_requirements(self.requirements, self.dl_dir, 2),
+            )
+        fetch_repo.assert_not_called()
+        clone_repo.assert_not_called()
+        self.assertDownloaded(self.requirements)
+
+    def test_download_requirements_concurrently(self):
+        c.download_requirements(self.requirements, self.dl_dir, jobs=3)
+        self.assertDownloaded(self.requirements)
+        c.download_requirements(self.requirements, self.dl_dir, jobs=3)
+        self.assertDownloaded(self.requirements)
+
+    def test_download_requirements_errors(self):
+        self.requirements[0]["repo_url"] += ".missing"
+        self.requirements[2]["sha"] = "0" * 40
+        with self.assertRaises(c.ComponentError) as e:
+            c.download_requirements(self.requirements, self.dl_dir, jobs=2)
+        message = str(e.exception)
+        self.assertIn("test1: ", message)
+        self.assertNotIn("test2: ", message)
+        self.assertIn("test3: ", message)
+        self.assertDownloaded(self.requirements[1:2])
+
+    def test_clones_share_mirror(self):
+        requirement = self.requirements[0]
+        c.download_requirements([requirement], self.dl_dir)
+        other_dl_dir = os.path.join(self.tmp_dir.name, "other")
+        with patch.object(c, "update_mirror", wraps=c.update_mirror) as um:
+            c.download_requirements([requirement], other_dl_dir)
+        um.assert_called_once_with(
+            requirement["repo_url"], requirement["sha"]
+        )
+
+        self.assertEqual(1, len(os.listdir(self.mirror_dir)))
+        mirror_dir = os.path.join(
+            self.mirror_dir, os.listdir(self.mirror_dir)[0]
+        )
+        for dl_dir in (self.dl_dir, other_dl_dir):
+            repo = git.Repo(os.path.join(dl_dir, requirement["name"]))
+            alternates = os.path.join(
+                repo.git_dir, "objects", "info", "alternates"
+            )
+            with open(alternates) as f:
+                self.assertEqual(
+                    os.path.join(mirror_dir, "objects"), f.read().strip()
+                )
+            self.assertEqual(
+                requirement["repo_url"], repo.remote("origin").url
+            )
+
+    def test_mirror_refetches_missing_commit(self):
+        requirement = self.requirements[0]
+        c.download_requirements([requirement], self.dl_dir)
+        remote = git.Repo(requirement["repo_url"] + ".work")
+        actor = git.Actor("test", "test@example.com")
+        new_commit = remote.index.commit(
+            "new", author=actor, committer=actor
+        )
+        remote.git.push(requirement["repo_url"], "HEAD:master")
+
+        requirement["sha"] = requirement["ref"] = new_commit.hexsha
+        self.assertEqual(
+            0, c.download_requirements([requirement], self.dl_dir)
+        )
+        self.assertDownloaded([requirement])
+        mirror = git.Repo(c.update_mirror(requirement["repo_url"]))
+        self.assertTrue(c.has_commit(mirror, new_commit.hexsha))
+
+    def test_has_commit(self):
+        repo = git.Repo(self.requirements[0]["repo_url"])
+        self.assertTrue(c.has_commit(repo, self.requirements[0]["sha"]))
+        self.assertFalse(c.has_commit(repo, "0" * 40))
+
+    def test_download_requirements_shallow(self):
+        remote_dir = os.path.join(self.tmp_dir.name, "deep.git")
+        shas = create_remote(remote_dir, commits=10)["master"]
+        git.Repo(remote_dir).config_writer().set_value(
+            "uploadpack", "allowFilter", "true"
+        ).release()
+        requirement = {
+            "name": "deep",
+            "ref": shas[5],
+            "ref_type": None,
+            "repo_url": "file://{path}".format(path=remote_dir),
+            "sha": shas[5],
+            "version": None,
+        }
+
+        for blobless in (False, True):
+            dl_dir = os.path.join(self.dl_dir, str(blobless))
+            c.download_requirements(
+                [requirement], dl_dir, shallow=True, blobless=blobless
+            )
+            self.assertDownloaded([requirement], dl_dir)
+            repo = git.Repo(os.path.join(dl_dir, "deep"))
+            self.assertEqual("1", repo.git.rev_list("--count", "HEAD"))
+            self.assertEqual(
+                blobless,
+                repo.config_reader().has_option(
+                    'remote "origin"', "partialclonefilter"
+                ),
+            )
+        self.assertFalse(os.path.exists(self.mirror_dir))
+
+
+class TestDependentsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.dl_dir = os.path.join(self.tmp_dir.name, "download")
+        mirror_patcher = patch.object(
+            c, "MIRROR_DIR", os.path.join(self.tmp_dir.name, "mirrors")
+        )
+        mirror_patcher.start()
+        self.addCleanup(mirror_patcher.stop)
+
+        self.components = []
+        for name, dependencies in (
+            ("product", ["dep"]),
+            ("other", []),
+            ("dep", []),
+        ):
+            remote_dir = os.path.join(self.tmp_dir.name, name + ".git")
+            metadata = yaml.dump(
+                {"dependencies": [
+                    {"name": d, "constraints": ["version<2"]}
+                    for d in dependencies
+                ]}
+            )
+            shas = create_remote(
+                remote_dir,
+                ("master", "stable"),
+                files={c.METADATA_FILENAME: metadata},
+            )
+            self.components.append(
+                c.Component(
+                    name=name,
+                    repo_url=remote_dir,
+                    is_product=False,
+                    releases=[
+                        {
+                            "version": "1.0.0",
+                            "sha": shas["master"][0],
+                            "series": "master",
+                        },
+                        {
+                            "version": "2.0.0",
+                            "sha": shas["stable"][0],
+                            "series": "stable",
+                        },
+                    ],
+                )
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_find_dependents(self):
+        index = c.update_dependents_index({}, self.components)
+        self.assertEqual(
+            ["product", "product"],
+            [
+                d.name
+                for d in c.find_dependents(index, self.components, "dep")
+            ],
+        )
+        self.assertEqual(
+            [], c.find_dependents(index, self.components, "product")
+        )
+
+    def test_index_missing_only(self):
+        index = c.update_dependents_index({}, self.components[1:])
+        with patch.object(c, "remote_refs", wraps=c.remote_refs) as refs:
+            c.update_dependents_index(
+                index, self.components, missing_only=True
+            )
+        refs.assert_called_once()
+        self.assertEqual(self.components[0].repo_url, refs.call_args[0][0])
+        self.assertEqual(
+            ["product", "product"],
+            [
+                d.name
+                for d in c.find_dependents(index, self.components, "dep")
+            ],
+        )
+
+    def test_index_refreshed_incrementally(self):
+        path = os.path.join(self.tmp_dir.name, "dependents.json")
+        index = c.update_dependents_index({}, self.components)
+        c.save_dependents_index(index, path)
+        index = c.load_dependents_index(path)
+
+        with patch.object(c, "load_commit_metadata") as load_metadata:
+            c.update_dependents_index(index, self.components)
+        load_metadata.assert_not_called()
+
+        product = self.components[0]
+        work_dir = "{path}.work".format(path=product.repo_url)
+        work_repo = git.Repo(work_dir)
+        with open(os.path.join(work_dir, c.METADATA_FILENAME), "w") as f:
+            f.write("dependencies: []\n")
+        work_repo.index.add([c.METADATA_FILENAME])
+        actor = git.Actor("test", "test@example.com")
+        work_repo.index.commit("Drop dep", author=actor, committer=actor)
+        work_repo.git.push(product.repo_url, "stable")
+
+        with patch.object(
+            c, "load_commit_metadata", wraps=c.load_commit_metadata
+        ) as load_metadata:
+            c.update_dependents_index(index, self.components)
+        load_metadata.assert_called_once()
+        self.assertFalse(os.path.exists(self.dl_dir))
+        self.assertEqual(
+            [product],
+            c.find_dependents(index, self.components, "dep"),
+        )
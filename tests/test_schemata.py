@@ -134,6 +134,29 @@ class TestValidationFunctions(unittest.TestCase):
         self.assertFalse(schemata.is_value_unique("key")(not_unique))
 
 
+class TestVersion(unittest.TestCase):
+    def test_ordering(self):
+        versions = [
+            schemata.Version(v["version"]) for v in unsorted_versions
+        ]
+        self.assertEqual(
+            [v["version"] for v in sorted_versions],
+            [str(v) for v in sorted(versions, reverse=True)],
+        )
+
+    def test_key(self):
+        self.assertEqual(
+            (2, 0, 0, 2, 1),
+            schemata.Version("r2.0.0-rc.1").key,
+        )
+
+    def test_hashable(self):
+        self.assertEqual(
+            {schemata.Version("1.0.0")},
+            {schemata.Version("1.0.0"), schemata.Version("r1.0.0")},
+        )
+
+
 class TestSchemaValidation(unittest.TestCase):
     def test_component_requirements_schema(self):
         minimal = {"dependencies": []}
@@ -445,3 +468,28 @@ class TestSchemaValidation(unittest.TestCase):
         self.assertTrue(
             schemata.constraints_schema.validate(valid_branch_constraints)
         )
+
+    def test_batch_schema(self):
+        operations = [
+            {
+                "operation": "release-add",
+                "component_name": "component0",
+                "version": "1.0.0",
+                "sha": "0000000000000000000000000000000000000000",
+                "series_name": "first",
+            },
+            {
+                "operation": "artifact-store-add",
+                "component_name": "component0",
+                "name": "artifacts",
+                "type": "file",
+            },
+        ]
+        validated = schemata.batch_schema.validate(operations)
+        self.assertIsNone(validated[1]["public_url"])
+        self.assertIsNone(validated[1]["description"])
+
+        invalid = [dict(operations[0], operation="release-remove")]
+        self.assertRaises(
+            schema.SchemaError, schemata.batch_schema.validate, invalid
+        )
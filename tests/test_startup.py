@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+
+DEFERRED_MODULES = ("git", "yaml", "schema", "rpc_component.component")
+# Importing the CLI took around 145ms when git, yaml and schema were loaded
+# eagerly, the bound leaves room for slower machines.
+MAX_IMPORT_MICROSECONDS = 100000
+
+# Modules imported through importlib's LazyLoader are left out of
+# `-X importtime` output even once executed, so the script reports which
+# of them have really been executed. Until then they are _LazyModule
+# instances rather than plain modules.
+EXECUTED_MODULES_SCRIPT = """
+import contextlib, io, json, sys, types
+sys.argv = ["component"] + {args!r}
+import rpc_component.cli as cli
+with contextlib.redirect_stdout(io.StringIO()), \\
+        contextlib.redirect_stderr(io.StringIO()):
+    try:
+        {code}
+    except SystemExit:
+        pass
+print(json.dumps([
+    name for name in {modules!r}
+    if type(sys.modules.get(name)) is types.ModuleType
+]))
+"""
+
+
+def executed_modules(args=(), code="cli.main()", cwd=None):
+    """Return the deferred modules executed by running the CLI."""
+    script = EXECUTED_MODULES_SCRIPT.format(
+        args=list(args), code=code, modules=DEFERRED_MODULES
+    )
+    output = subprocess.check_output(
+        [sys.executable, "-c", script], cwd=cwd, universal_newlines=True
+    )
+    return set(json.loads(output))
+
+
+def import_times(*args):
+    """Return the cumulative import time of each module, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + list(args),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            pass
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_cli(self):
+        self.assertEqual(set(), executed_modules(code="pass"))
+
+    def test_import_time(self):
+        times = import_times("-c", "import rpc_component.cli")
+        self.assertIn("rpc_component.cli", times)
+        for module in ("gitdb", "git.repo", "yaml", "schema"):
+            self.assertNotIn(module, times)
+        self.assertLess(times["rpc_component.cli"], MAX_IMPORT_MICROSECONDS)
+
+    def test_forced_import_detected(self):
+        self.assertEqual(
+            {"git", "schema"},
+            executed_modules(code="cli.git.Repo, cli.schema.Schema"),
+        )
+
+    def test_help(self):
+        self.assertEqual(set(), executed_modules(["--help"]))
+        self.assertEqual(set(), executed_modules(["release", "--help"]))
+
+    def test_argument_error(self):
+        executed = executed_modules(
+            ["release", "--component-name", "x", "add", "--version", "bad",
+             "--sha", "0" * 40, "--series-name", "master"]
+        )
+        self.assertNotIn("git", executed)
+        self.assertNotIn("rpc_component.component", executed)
+
+    def test_metadata_get(self):
+        with TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "components"))
+            executed = executed_modules(
+                ["--releases-dir", tmp_dir, "metadata", "get"], cwd=tmp_dir
+            )
+        self.assertIn("rpc_component.component", executed)
+        self.assertNotIn("git", executed)
+
+    def test_import_schemata(self):
+        times = import_times("-c", "import rpc_component.schemata")
+        self.assertNotIn("schema", times)